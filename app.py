@@ -1,14 +1,21 @@
+import html
+import os
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-from utils.pdf_reader import extract_text_from_pdf
-from utils.skill_extractor import analyse_cv_vs_jd
-from utils.ats_check import ats_audit
-from utils.skill_extractor import _SKILLS_BY_CAT  # just for suggestions mapping
-from utils.suggestions import craft_suggestions
-from utils.parser_preview import pdf_text_preview
-from utils.narrative import recruiter_narrative
-from utils.skill_extractor import analyse_cv_vs_jd, _SKILLS_BY_CAT
-from utils.suggestions import craft_suggestions
-from utils.ats_check import ats_audit
+from utils.cache import cached_parse_pdf, content_hash
+from utils.report import run_analysis, run_deep_check
+from utils.skill_bank import get_bank
+from utils import telemetry
+
+
+get_bank().matcher  # compile before the first analysis, not during it
+
+
+@st.cache_resource
+def analysis_executor():
+    # Shared by all sessions; analyses run here so a long one never blocks a
+    # script run (and with it every widget interaction).
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="cvsense-analysis")
 
 
 def top_missing_for_target(results: dict, target: float = 90.0, max_items: int = 5):
@@ -18,6 +25,48 @@ def top_missing_for_target(results: dict, target: float = 90.0, max_items: int =
     return results["missing"][:max_items]
 
 
+def upload_state(key: str, uploaded):
+    """
+    Parse an upload once per upload identity. Reruns triggered by other
+    widgets find it in session_state and never touch the file again.
+    """
+    if uploaded is None:
+        st.session_state.pop(key, None)
+        return None
+    state = st.session_state.get(key)
+    if state is None or state["file_id"] != uploaded.file_id:
+        data = uploaded.getvalue()
+        state = {"file_id": uploaded.file_id, "name": uploaded.name,
+                 "hash": content_hash(data), "doc": None, "text": "", "error": ""}
+        try:
+            if uploaded.name.lower().endswith(".pdf"):
+                # parsed in the ingest process pool, so a bad PDF cannot hang
+                # or kill the server; cached process-wide by content
+                state["doc"] = cached_parse_pdf(data, uploaded.name, isolated=True)
+                state["error"] = state["doc"].error
+                state["text"] = state["doc"].text
+            else:
+                state["text"] = data.decode("utf-8")
+        except Exception as e:
+            state["error"] = str(e)
+        st.session_state[key] = state
+    return state
+
+
+def traced(name: str, fn, *args):
+    # one telemetry record per job, with per-stage timings and counters
+    with telemetry.request(name):
+        return fn(*args)
+
+
+def submit_job(key, fn, *args):
+    progress = {"frac": 0.0, "stage": "Queued"}
+    st.session_state["job"] = {
+        "key": key,
+        "progress": progress,
+        "future": analysis_executor().submit(traced, fn.__name__, fn, *args, progress),
+    }
+
 
 # Page config
 st.set_page_config(page_title="CVSense Pro", layout="centered")
@@ -47,30 +96,160 @@ else:
     jd_text_input = st.text_area("Paste Job Description Here", height=200)
 
 
-# Extract CV Text
-cv_text = ""
-if uploaded_cv:
-    try:
-        cv_text = extract_text_from_pdf(uploaded_cv)
-    except Exception as e:
-        st.error(f"Error reading CV: {e}")
+cv_state = upload_state("cv_upload", uploaded_cv)
+if cv_state and cv_state["error"]:
+    st.error(f"Error reading CV: {cv_state['error']}")
 
 # Extract JD Text
 jd_text = ""
-if uploaded_jd:
-    try:
-        if uploaded_jd.name.endswith(".pdf"):
-            jd_text = extract_text_from_pdf(uploaded_jd)
-        else:
-            jd_text = uploaded_jd.read().decode("utf-8")
-    except Exception as e:
-        st.error(f"Error reading JD: {e}")
+jd_state = upload_state("jd_upload", uploaded_jd)
+if jd_state:
+    if jd_state["error"]:
+        st.error(f"Error reading JD: {jd_state['error']}")
+    jd_text = jd_state["text"]
 elif jd_text_input:
     jd_text = jd_text_input
 
+cv_text = cv_state["text"] if cv_state else ""
+# Identity of the current inputs: results for any other key are stale
+analysis_key = (
+    (cv_state["hash"], content_hash(jd_text), get_bank().version) if cv_state and jd_text else None
+)
+
+
+@st.fragment(run_every=0.5)
+def analysis_progress():
+    # Only this fragment reruns while the job is in flight; once it finishes,
+    # one full rerun renders the results.
+    job = st.session_state.get("job")
+    if job is None:
+        return
+    if job["future"].done():
+        try:
+            st.session_state["analysis"] = {"key": job["key"], **job["future"].result()}
+        except Exception as e:
+            st.session_state["analysis_error"] = str(e)
+        del st.session_state["job"]
+        st.rerun()
+    st.progress(job["progress"].get("frac", 0.0), text=job["progress"].get("stage", "Queued"))
+
+
+def highlight_html(text: str, spans) -> str:
+    """`text` as HTML with the (start, end, skill) spans marked."""
+    if len(text.lower()) != len(text):
+        spans = []   # span offsets index text.lower(); they would drift here
+    out, pos = [], 0
+    # longest phrase first at each start; overlapped ones ("azure" inside
+    # "azure data factory") are skipped
+    for start, end, _ in sorted(spans, key=lambda sp: (sp[0], -sp[1])):
+        if start < pos:
+            continue
+        out.append(html.escape(text[pos:start]))
+        out.append(f"<mark>{html.escape(text[start:end])}</mark>")
+        pos = end
+    out.append(html.escape(text[pos:]))
+    return '<div style="white-space: pre-wrap">' + "".join(out) + "</div>"
+
+
+def render_analysis(a: dict):
+    results, ats = a["results"], a["ats"]
+
+    st.subheader("Match Results (ATS-style)")
+    st.write(f"Match Score: {results['score']}%")
+    st.caption(f"Text similarity: {a['similarity']}% · blended score: {a['blended_score']}%")
+
+    c1, c2, c3 = st.columns(3)
+    with c1: st.metric("JD Skills", len(results["jd_skills"]))
+    with c2: st.metric("Matched", len(results["matched"]))
+    with c3: st.metric("Missing", len(results["missing"]))
+
+    # Category coverage table
+    st.subheader("Category Coverage")
+    rows = []
+    for cat, d in results["category_breakdown"].items():
+        pct = round(100.0 * d["matched"] / d["jd_total"], 1) if d["jd_total"] else 0.0
+        rows.append(f"- {cat.replace('_',' ')}: {d['matched']}/{d['jd_total']}  ({pct}%)")
+    if rows:
+        st.write("\n".join(rows))
+    else:
+        st.write("No JD skills detected in known categories.")
+
+    # Recruiter narrative
+    st.subheader("Narrative Summary")
+    st.write(a["narrative"])
+
+    # Target to reach 90%
+    target_list = top_missing_for_target(results, target=90.0, max_items=5)
+    if target_list:
+        st.info("Add evidence for these to reach ~90%:")
+        st.write(", ".join(target_list))
+
+    with st.expander("Matched Skills"):
+        st.write(", ".join(results["matched"]) or "None")
+    with st.expander("Missing Skills (consider adding if you have them)"):
+        st.write(", ".join(results["missing"]) or "None")
+    with st.expander("Extra Skills in CV (not in JD)"):
+        st.write(", ".join(results["extra"]) or "None")
+    with st.expander("Detected JD Skills"):
+        st.write(", ".join(results["jd_skills"]) or "None")
+
+    # 2) ATS checks (document)
+    st.subheader("ATS Checks")
+    cc = st.columns(4)
+    cc[0].metric("Pages", ats["pages"])
+    cc[1].metric("Tables", "n/a" if ats["tables"] is None else ats["tables"])
+    cc[2].metric("Images", ats["images"])
+    cc[3].metric("Font families", ats["font_families"])
+    with st.expander("Warnings"):
+        if ats["warnings"]:
+            st.write("\n".join(f"- {w}" for w in ats["warnings"]))
+        else:
+            st.write("No major ATS issues detected.")
+    if ats["mode"] == "fast" and "job" not in st.session_state:
+        st.caption("Quick check: table detection is skipped.")
+        if st.button("Run deep check (tables)"):
+            submit_job(a["key"], run_deep_check, uploaded_cv.getvalue(), uploaded_cv.name, a)
+            st.rerun()
+
+    # 3) Suggestions (skills + ATS fixes)
+    st.subheader("Suggestions")
+    if a["suggestions"]:
+        st.write("\n".join(f"- {s}" for s in a["suggestions"]))
+    else:
+        st.write("Looks solid. Minor polishing only.")
+
+    # 4) ATS parsing simulation preview
+    st.subheader("ATS Parse Preview (Text)")
+    st.caption("This is roughly what a basic ATS parser might read from your PDF.")
+    with st.expander("Show parsed text"):
+        if a["preview"]:
+            st.caption("Skills matched against the JD are highlighted.")
+            st.markdown(highlight_html(a["preview"], a.get("preview_highlights", [])),
+                        unsafe_allow_html=True)
+        else:
+            st.write("No text extracted.")
+
+    # 5) Download report
+    st.download_button(
+        label="Download Report (Markdown)",
+        data=a["report_md"],
+        file_name="cvsense_report.md",
+        mime="text/markdown"
+    )
+
+
 # Analyse button
 if uploaded_cv and (uploaded_jd or jd_text_input):
     if st.button("Analyse Compatibility"):
+        st.session_state.pop("analysis_error", None)
+        done = st.session_state.get("analysis", {}).get("key") == analysis_key
+        running = st.session_state.get("job", {}).get("key") == analysis_key
+        if analysis_key and cv_state["doc"] and jd_text.strip() and not (done or running):
+            submit_job(analysis_key, run_analysis, cv_state["doc"], cv_text, jd_text, cv_state["hash"])
+
+    if analysis_key and (
+        "job" in st.session_state or st.session_state.get("analysis", {}).get("key") == analysis_key
+    ):
         st.success("Files ready for processing")
         st.subheader("Preview Extracted Content")
 
@@ -80,97 +259,16 @@ if uploaded_cv and (uploaded_jd or jd_text_input):
         with st.expander("Job Description Text"):
             st.write(jd_text[:1000] + "..." if len(jd_text) > 1000 else jd_text)
 
-        # --- Semantic keyphrase matching (dynamic, domain-agnostic) ---
-        if cv_text.strip() and jd_text.strip():
-            # 1) Skills analysis (ATS-style)
-            results = analyse_cv_vs_jd(cv_text, jd_text)
-
-            st.subheader("Match Results (ATS-style)")
-            st.write(f"Match Score: {results['score']}%")
-
-            c1, c2, c3 = st.columns(3)
-            with c1: st.metric("JD Skills", len(results["jd_skills"]))
-            with c2: st.metric("Matched", len(results["matched"]))
-            with c3: st.metric("Missing", len(results["missing"]))
-
-            # Category coverage table
-            st.subheader("Category Coverage")
-            rows = []
-            for cat, d in results["category_breakdown"].items():
-                pct = round(100.0 * d["matched"] / d["jd_total"], 1) if d["jd_total"] else 0.0
-                rows.append(f"- {cat.replace('_',' ')}: {d['matched']}/{d['jd_total']}  ({pct}%)")
-            if rows:
-                st.write("\n".join(rows))
-            else:
-                st.write("No JD skills detected in known categories.")
-
-            # Recruiter narrative
-            st.subheader("Narrative Summary")
-            st.write(recruiter_narrative(results))
-
-            # Target to reach 90%
-            target_list = top_missing_for_target(results, target=90.0, max_items=5)
-            if target_list:
-                st.info("Add evidence for these to reach ~90%:")
-                st.write(", ".join(target_list))
-
-            with st.expander("Matched Skills"):
-                st.write(", ".join(results["matched"]) or "None")
-            with st.expander("Missing Skills (consider adding if you have them)"):
-                st.write(", ".join(results["missing"]) or "None")
-            with st.expander("Extra Skills in CV (not in JD)"):
-                st.write(", ".join(results["extra"]) or "None")
-            with st.expander("Detected JD Skills"):
-                st.write(", ".join(results["jd_skills"]) or "None")
-
-            # 2) ATS checks (document)
-            ats = ats_audit(uploaded_cv)
-            st.subheader("ATS Checks")
-            cc = st.columns(4)
-            cc[0].metric("Pages", ats["pages"])
-            cc[1].metric("Tables", ats["tables"])
-            cc[2].metric("Images", ats["images"])
-            cc[3].metric("Font families", ats["font_families"])
-            with st.expander("Warnings"):
-                if ats["warnings"]:
-                    st.write("\n".join(f"- {w}" for w in ats["warnings"]))
-                else:
-                    st.write("No major ATS issues detected.")
-
-            # 3) Suggestions (skills + ATS fixes)
-            st.subheader("Suggestions")
-            suggestions = craft_suggestions(results, _SKILLS_BY_CAT, ats)
-            if suggestions:
-                st.write("\n".join(f"- {s}" for s in suggestions))
-            else:
-                st.write("Looks solid. Minor polishing only.")
-
-            # 4) ATS parsing simulation preview
-            st.subheader("ATS Parse Preview (Text)")
-            st.caption("This is roughly what a basic ATS parser might read from your PDF.")
-            preview_txt = pdf_text_preview(uploaded_cv, max_chars=2500)
-            with st.expander("Show parsed text"):
-                st.write(preview_txt or "No text extracted.")
-
-            # 5) Download report
-            report_md = []
-            report_md.append(f"# CVSense Pro Report\n")
-            report_md.append(f"**Score:** {results['score']}%\n")
-            report_md.append("## Category Coverage\n")
-            for cat, d in results["category_breakdown"].items():
-                pct = round(100.0 * d["matched"] / d["jd_total"], 1) if d["jd_total"] else 0.0
-                report_md.append(f"- {cat.replace('_',' ')}: {d['matched']}/{d['jd_total']} ({pct}%)")
-            report_md.append("\n## Matched Skills\n" + (", ".join(results["matched"]) or "None"))
-            report_md.append("\n## Missing Skills\n" + (", ".join(results["missing"]) or "None"))
-            report_md.append("\n## Extra Skills\n" + (", ".join(results["extra"]) or "None"))
-            report_md.append("\n## ATS Warnings\n" + ("\n".join(f"- {w}" for w in ats["warnings"]) or "None"))
-            report_md.append("\n## Narrative\n" + recruiter_narrative(results))
-            md_text = "\n".join(report_md)
-
-            st.download_button(
-                label="Download Report (Markdown)",
-                data=md_text,
-                file_name="cvsense_report.md",
-                mime="text/markdown"
-            )
+    if "analysis_error" in st.session_state:
+        st.error(f"Analysis failed: {st.session_state['analysis_error']}")
+    if "job" in st.session_state:
+        analysis_progress()
+    elif analysis_key and st.session_state.get("analysis", {}).get("key") == analysis_key:
+        render_analysis(st.session_state["analysis"])
 
+# Debug panel: recent per-request timings and the aggregate metrics
+if os.environ.get("CVSENSE_DEBUG_PANEL") == "1":
+    with st.expander("Debug: pipeline timings"):
+        for rec in reversed(telemetry.memory_sink.latest(5)):
+            st.json(rec, expanded=False)
+        st.code(telemetry.prometheus_text(), language="text")
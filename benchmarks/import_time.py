@@ -0,0 +1,58 @@
+# benchmarks/import_time.py
+"""
+Cold-import cost of the core library.
+
+    python -m benchmarks.import_time                 # utils.skill_extractor
+    python -m benchmarks.import_time utils.batch -n 10
+
+Each sample imports the module in a fresh interpreter and reports wall time
+and peak RSS, so nothing is shared with the measuring process.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import resource, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(dt, rss_kb)
+"""
+
+
+def measure(module: str, runs: int = 5) -> dict:
+    times, rss = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            cwd=_REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        times.append(float(out[0]))
+        rss.append(int(out[1]) / 1024.0)
+    return {
+        "module": module,
+        "runs": runs,
+        "import_s_median": round(statistics.median(times), 4),
+        "import_s_min": round(min(times), 4),
+        "peak_rss_mb": round(max(rss), 1),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Measure cold import time of a module.")
+    ap.add_argument("module", nargs="?", default="utils.skill_extractor")
+    ap.add_argument("-n", "--runs", type=int, default=5)
+    args = ap.parse_args(argv)
+    print(json.dumps(measure(args.module, args.runs), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/normalise_diff.py
+"""
+Regression check: the one-pass scrub in skill_extractor._normalise_text
+against the six-pass cascade it replaced.
+
+    python -m benchmarks.normalise_diff                  # report differences
+    python -m benchmarks.normalise_diff --examples 10 --out diff.json
+
+Two corpora are compared. The synthetic CVs/JDs of benchmarks.corpus
+(contact lines included) must normalise identically; the command exits 1
+if any differs. Fragments glue URLs, emails, phones, years and digit runs
+to skills with and without separators, which is where the two scrubs
+part ways. The cascade removed URLs, then emails, then phones, each on
+the previous result. The combined regex takes the leftmost match in
+one scan. So a digit run can join a later email into one "phone" (the
+email's leftover is kept), and an email can swallow a skill glued to
+it. Tokens are both gained and lost, and so, rarely, are exact skill
+hits. The report counts each kind and lists examples.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+from typing import Dict, List, Optional
+
+from benchmarks.corpus import generate
+from utils.skill_bank import get_bank
+from utils.skill_extractor import _normalise_text
+
+_FRAGMENTS = [
+    "python", "sql", "azure data factory", "k8s", "c++", "v2.0", "3d",
+    "12345", "678", "42", "2019", "1999",
+    "a@b.com", "jane.doe@mail.co.uk", "https://x.io/a", "www.site.com/p",
+    "+44 (0)20 7946 0958", "555-1234", "(555) 123 4567", "-", "(", ")",
+]
+_SEPARATORS = [" ", "", ", ", "\n", "/", "-"]
+
+
+def cascade_normalise(t: str) -> str:
+    """_normalise_text as it was before the one-pass scrub (reference only)."""
+    if not t:
+        return ""
+    t = t.lower()
+    t = re.sub(r"https?://\S+|www\.\S+", " ", t)
+    t = re.sub(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", " ", t)
+    t = re.sub(r"\+?\d[\d\-\s()]{6,}\d", " ", t)   # phones
+    t = re.sub(r"\b(19|20)\d{2}\b", " ", t)        # years
+    t = re.sub(r"[^a-z0-9\-\+\./ ]", " ", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    return t
+
+
+def fragments(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choice(_FRAGMENTS) + rng.choice(_SEPARATORS) for _ in range(rng.randint(2, 6)))
+        for _ in range(n)
+    ]
+
+
+def compare(texts: List[str], examples: int = 5) -> Dict:
+    bank = get_bank()
+
+    def hits(s: str):
+        return {bank.canon(p) for p in bank.matcher.search(s)}
+
+    out = {"docs": len(texts), "differ": 0, "tokens_gained": 0, "tokens_lost": 0,
+           "skill_hits_changed": 0, "examples": []}
+    for t in texts:
+        old, new = cascade_normalise(t), _normalise_text(t)
+        if old == new:
+            continue
+        out["differ"] += 1
+        a, b = old.split(), new.split()
+        gained = [tok for tok in b if tok not in a]
+        lost = [tok for tok in a if tok not in b]
+        out["tokens_gained"] += bool(gained)
+        out["tokens_lost"] += bool(lost)
+        changed = sorted(hits(old) ^ hits(new))
+        out["skill_hits_changed"] += bool(changed)
+        if len(out["examples"]) < examples and (lost or changed):
+            out["examples"].append({"text": t, "cascade": old, "one_pass": new,
+                                    "skill_hits_changed": changed})
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Compare _normalise_text with the old cascade.")
+    ap.add_argument("--cvs", type=int, default=300)
+    ap.add_argument("--fragments", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--examples", type=int, default=5)
+    ap.add_argument("--out", default=None, help="write the report JSON here")
+    args = ap.parse_args(argv)
+
+    corpus = generate(args.cvs, 20, seed=args.seed, with_pdf=False)
+    report = {
+        "corpus": compare([d["text"] for d in corpus["cvs"] + corpus["jds"]], args.examples),
+        "fragments": compare(fragments(args.fragments, args.seed), args.examples),
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["corpus"]["differ"]:
+        print(f"{report['corpus']['differ']} corpus documents normalise differently", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
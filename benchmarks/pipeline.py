@@ -0,0 +1,174 @@
+# benchmarks/pipeline.py
+"""
+Per-stage benchmarks of the matching pipeline on a synthetic corpus.
+
+    python -m benchmarks.pipeline --cvs 200 --out bench.json
+    python -m benchmarks.pipeline --cvs 200 --compare bench.json   # flag regressions
+
+Stages: normalise, exact_hits, fuzzy_boost, analyse, similarity,
+ats_audit, pdf_text_preview. Each is timed per call (throughput and latency
+percentiles), then run once more under tracemalloc for peak memory, so the
+tracing overhead never shows up in the timings. Caches are bypassed.
+--compare exits 1 when a stage's p50 or peak memory grew by more than
+--threshold against the earlier run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import generate
+from utils.ats_check import ats_audit
+from utils.parser_preview import pdf_text_preview
+from utils.similarity import similarity_scores, vectorize
+from utils.skill_bank import get_bank
+from utils.skill_extractor import (
+    _exact_phrase_hits, _fuzzy_boost, _normalise_text, analyse_cv_vs_jd,
+)
+
+STAGES = ["normalise", "exact_hits", "fuzzy_boost", "analyse", "similarity", "ats_audit",
+          "pdf_text_preview"]
+
+
+def _pdf(item: Dict):
+    f = io.BytesIO(item["pdf"])
+    f.name = item["name"] + ".pdf"
+    return f
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def time_stage(fn: Callable, items: List, repeat: int = 1, warmup: int = 2) -> Dict:
+    for it in items[:warmup]:
+        fn(it)
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for it in items:
+            t = time.perf_counter()
+            fn(it)
+            lat.append(time.perf_counter() - t)
+    wall = time.perf_counter() - t0
+    lat.sort()
+    tracemalloc.start()
+    for it in items:
+        fn(it)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ms = lambda s: round(s * 1000.0, 3)
+    return {
+        "calls": len(lat),
+        "throughput_per_s": round(len(lat) / wall, 2) if wall else 0.0,
+        "mean_ms": ms(statistics.fmean(lat)),
+        "p50_ms": ms(_percentile(lat, 0.50)),
+        "p90_ms": ms(_percentile(lat, 0.90)),
+        "p99_ms": ms(_percentile(lat, 0.99)),
+        "max_ms": ms(lat[-1]),
+        "peak_mem_kb": round(peak / 1024.0, 1),
+    }
+
+
+def run(corpus: Dict, stages: Optional[List[str]] = None, repeat: int = 1,
+        audit_mode: str = "fast") -> Dict[str, Dict]:
+    bank = get_bank()
+    bank.matcher  # compile outside the timings
+    cvs, jds = corpus["cvs"], corpus["jds"]
+    norm = {it["name"]: _normalise_text(it["text"]) for it in cvs}
+    missing = {n: bank.all_skills - _exact_phrase_hits(t, bank) for n, t in norm.items()}
+    pairs = [(cv, jds[i % len(jds)]) for i, cv in enumerate(cvs)]
+    jd_vecs = vectorize([jd["text"] for jd in jds])
+
+    benches = {
+        "normalise": (lambda it: _normalise_text(it["text"]), cvs),
+        "exact_hits": (lambda it: _exact_phrase_hits(norm[it["name"]], bank), cvs),
+        "fuzzy_boost": (lambda it: _fuzzy_boost(norm[it["name"]], missing[it["name"]]), cvs),
+        "analyse": (lambda p: analyse_cv_vs_jd(p[0]["text"], p[1]["text"], bank), pairs),
+        # one CV vectorised and scored against every JD
+        "similarity": (lambda it: similarity_scores(jd_vecs, vectorize([it["text"]])), cvs),
+        "ats_audit": (lambda it: ats_audit(_pdf(it), mode=audit_mode, time_budget_s=0, max_pages=0), cvs),
+        "pdf_text_preview": (lambda it: pdf_text_preview(_pdf(it)), cvs),
+    }
+    return {
+        name: time_stage(benches[name][0], benches[name][1], repeat)
+        for name in (stages or STAGES)
+    }
+
+
+def compare(current: Dict, previous: Dict, threshold: float = 0.10) -> List[str]:
+    """Stages whose p50 latency or peak memory grew by more than `threshold`."""
+    out = []
+    for stage, cur in current["stages"].items():
+        prev = previous.get("stages", {}).get(stage)
+        if not prev:
+            continue
+        for metric in ("p50_ms", "peak_mem_kb"):
+            if prev[metric] and cur[metric] > prev[metric] * (1.0 + threshold):
+                out.append(f"{stage}.{metric}: {prev[metric]} -> {cur[metric]} "
+                           f"(+{100.0 * (cur[metric] / prev[metric] - 1.0):.1f}%)")
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark pipeline stages on a synthetic corpus.")
+    ap.add_argument("--cvs", type=int, default=100)
+    ap.add_argument("--jds", type=int, default=5)
+    ap.add_argument("--words", type=int, default=600)
+    ap.add_argument("--density", type=float, default=0.08)
+    ap.add_argument("--typo-rate", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=1, help="timed passes over the corpus")
+    ap.add_argument("--stages", nargs="*", choices=STAGES, default=None)
+    ap.add_argument("--audit-mode", choices=["fast", "deep"], default="fast")
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--compare", default=None, help="earlier results JSON to check against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed relative growth")
+    args = ap.parse_args(argv)
+
+    params = {k: getattr(args, k) for k in
+              ("cvs", "jds", "words", "density", "typo_rate", "seed", "repeat", "audit_mode")}
+    needs_pdf = not args.stages or {"ats_audit", "pdf_text_preview"} & set(args.stages)
+    corpus = generate(args.cvs, args.jds, args.words, args.density, args.typo_rate,
+                      seed=args.seed, with_pdf=bool(needs_pdf))
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "bank_version": get_bank().version,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": params,
+        },
+        "stages": run(corpus, args.stages, args.repeat, args.audit_mode),
+    }
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("meta", {}).get("params") != params:
+            print("warning: comparing runs with different parameters", file=sys.stderr)
+        regressions = compare(result, previous, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
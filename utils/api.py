@@ -0,0 +1,314 @@
+# utils/api.py
+"""
+Asynchronous HTTP API over the analysis pipeline (tornado).
+
+    python -m utils.api --port 8080
+
+    POST /v1/analyses         multipart: cv (PDF/TXT file), jd (PDF/TXT file) or
+                              jd_text (field), optional mode=fast|deep;
+                              or JSON {"cv_text": ..., "jd_text": ...}
+    GET  /v1/analyses/<id>    the same result, looked up by id
+    GET  /healthz             liveness plus queue depth
+    GET  /metrics             telemetry.prometheus_text()
+
+An analysis returns the bundle the app renders (results, ats, suggestions,
+narrative, preview, preview_highlights, report_md) plus "id", a hash of the
+CV and JD content, audit mode and bank version. Posting the same inputs again joins the
+analysis already running or returns the stored one. `?wait=0` answers
+202 at once; poll the id until it is done.
+
+The event loop only reads requests and writes responses. Analyses run on a
+bounded thread pool (CVSENSE_API_WORKERS, default 4) and PDFs are parsed in
+the utils.ingest process pool, so one slow upload never holds up the
+others. At most CVSENSE_API_MAX_PENDING analyses (default 4 x workers) may
+be queued or running; beyond that new ones get 429 with Retry-After.
+Results live in their own store, apart from the analysis cache so cache
+churn never evicts a result a client is still polling for: the last
+CVSENSE_API_RESULTS (default 1024) in memory, plus a SQLite tier at
+CVSENSE_API_RESULTS_DB when set (kept across restarts, read off the event
+loop).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import tornado.web
+
+from utils import telemetry
+from utils.cache import AnalysisCache, cached_parse_pdf, content_hash
+from utils.document import AUDIT_MODES
+from utils.report import run_analysis, run_deep_check
+from utils.skill_bank import get_bank
+
+WORKERS = int(os.environ.get("CVSENSE_API_WORKERS", 4))
+MAX_PENDING = int(os.environ.get("CVSENSE_API_MAX_PENDING", 0))   # 0 = 4 x workers
+MAX_UPLOAD_MB = int(os.environ.get("CVSENSE_API_MAX_UPLOAD_MB", 10))
+RESULT_ITEMS = int(os.environ.get("CVSENSE_API_RESULTS", 1024))
+RESULTS_DB = os.environ.get("CVSENSE_API_RESULTS_DB") or None
+RETRY_AFTER_S = 2
+
+
+class Busy(Exception):
+    """The pending-analysis limit is reached; the client should retry later."""
+
+
+def _read_upload(data: bytes, name: str) -> Tuple[Any, str]:
+    """(PdfDocument or None, text) for an uploaded CV/JD."""
+    if name.lower().endswith(".pdf") or data[:5] == b"%PDF-":
+        doc = cached_parse_pdf(data, name, isolated=True)
+        if doc.error and not doc.text.strip():
+            raise ValueError(f"Could not read {name or 'PDF'}: {doc.error}")
+        return doc, doc.text
+    return None, data.decode("utf-8", errors="ignore")
+
+
+def _analyse_job(cv: Dict, jd: Dict, mode: str, progress: Dict) -> Dict:
+    # Runs on the executor thread; the parse itself happens in the ingest pool.
+    with telemetry.request("api_analysis", mode=mode):
+        progress.update(frac=0.05, stage="Reading documents")
+        cv_doc, cv_text = (None, cv["text"]) if "text" in cv else _read_upload(cv["data"], cv["name"])
+        jd_text = jd["text"] if "text" in jd else _read_upload(jd["data"], jd["name"])[1]
+        if not cv_text.strip() or not jd_text.strip():
+            raise ValueError("CV and JD must both contain text")
+        cv_hash = content_hash(cv["data"]) if "data" in cv else None
+        bundle = run_analysis(cv_doc, cv_text, jd_text, cv_hash, progress)
+        if mode == "deep" and cv_doc is not None:
+            bundle = run_deep_check(cv["data"], cv["name"], bundle, progress)
+        return bundle
+
+
+class AnalysisService:
+    """
+    Bounded executor plus the id -> in-flight/finished analysis bookkeeping.
+    Only touched from the event loop thread, so it needs no locks.
+    """
+
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING,
+                 results: Optional[AnalysisCache] = None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cvsense-api")
+        self.results = results or AnalysisCache(RESULT_ITEMS, RESULTS_DB)
+        # disk-tier reads; not the analysis pool, so they never queue behind analyses
+        self._store_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cvsense-api-store")
+        self._running: Dict[str, Tuple[asyncio.Future, Dict]] = {}
+        self._errors: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+
+    def analysis_id(self, cv: Dict, jd: Dict, mode: str) -> str:
+        def ident(part: Dict) -> str:
+            return "t" + content_hash(part["text"]) if "text" in part else "f" + content_hash(part["data"])
+        # Runs on the event loop: read the bank as last loaded, never reload it
+        # here. Analyses call get_bank() on the worker threads, which picks up
+        # a changed bank; the next id then carries the new version.
+        version = get_bank(reload=False).version
+        return content_hash(":".join((ident(cv), ident(jd), mode, version)))[:32]
+
+    @staticmethod
+    def _key(analysis_id: str) -> str:
+        return f"api:{analysis_id}"
+
+    async def _stored(self, analysis_id: str) -> Optional[Dict]:
+        if self.results.disk_path is None:
+            return self.results.get(self._key(analysis_id))
+        return await asyncio.get_running_loop().run_in_executor(
+            self._store_io, self.results.get, self._key(analysis_id)
+        )
+
+    def _run(self, analysis_id: str, cv: Dict, jd: Dict, mode: str, progress: Dict) -> Dict:
+        # Stored on the worker thread, before the future resolves, so a
+        # finished analysis is never missing from both _running and the store.
+        bundle = _analyse_job(cv, jd, mode, progress)
+        self.results.put(self._key(analysis_id), bundle)
+        return bundle
+
+    async def lookup(self, analysis_id: str) -> Tuple[str, Any]:
+        """("done", bundle) | ("pending", progress) | ("error", (status, msg)) | ("unknown", None)"""
+        if analysis_id in self._running:
+            return "pending", self._running[analysis_id][1]
+        bundle = await self._stored(analysis_id)
+        if bundle is not None:
+            return "done", bundle
+        if analysis_id in self._errors:
+            return "error", self._errors[analysis_id]
+        return "unknown", None
+
+    @property
+    def pending(self) -> int:
+        return len(self._running)
+
+    async def submit(self, cv: Dict, jd: Dict, mode: str) -> Tuple[str, Optional[asyncio.Future]]:
+        """
+        Start (or join) the analysis of these inputs. Returns its id and a
+        future, or None as the future when the result is already stored.
+        """
+        analysis_id = self.analysis_id(cv, jd, mode)
+        if analysis_id not in self._running:
+            if await self._stored(analysis_id) is not None:
+                telemetry.count("api_stored_hits")
+                return analysis_id, None
+        # checked after the store read: the same inputs may have started meanwhile
+        if analysis_id in self._running:
+            telemetry.count("api_joined")
+            return analysis_id, self._running[analysis_id][0]
+        if self.pending >= self.max_pending:
+            telemetry.count("api_rejected")
+            raise Busy()
+        self._errors.pop(analysis_id, None)
+        progress = {"frac": 0.0, "stage": "Queued"}
+        fut = asyncio.get_running_loop().run_in_executor(
+            self.executor, self._run, analysis_id, cv, jd, mode, progress
+        )
+        self._running[analysis_id] = (fut, progress)
+        fut.add_done_callback(lambda f: self._finish(analysis_id, f))
+        return analysis_id, fut
+
+    def _finish(self, analysis_id: str, fut: asyncio.Future):
+        self._running.pop(analysis_id, None)
+        err = RuntimeError("Analysis cancelled") if fut.cancelled() else fut.exception()
+        if err is None:
+            return   # stored by _run
+        # unreadable input is the client's problem; anything else is ours
+        self._errors[analysis_id] = (422 if isinstance(err, ValueError) else 500, str(err))
+        while len(self._errors) > 256:
+            self._errors.popitem(last=False)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._store_io.shutdown(wait=False)
+
+
+# --------- handlers ---------
+class _JsonHandler(tornado.web.RequestHandler):
+    def initialize(self, service: AnalysisService):
+        self.service = service
+
+    def send(self, status: int, body: Dict):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(body, default=list))
+
+    def write_error(self, status_code: int, **kwargs):
+        self.send(status_code, {"error": self._reason})
+
+    async def send_result(self, analysis_id: str):
+        state, value = await self.service.lookup(analysis_id)
+        if state == "done":
+            self.send(200, {"id": analysis_id, "status": "done", **value})
+        elif state == "pending":
+            self.set_header("Location", f"/v1/analyses/{analysis_id}")
+            self.send(202, {"id": analysis_id, "status": "pending", "progress": dict(value)})
+        elif state == "error":
+            self.send(value[0], {"id": analysis_id, "status": "error", "error": value[1]})
+        else:
+            self.send(404, {"id": analysis_id, "error": "Unknown analysis id"})
+
+
+class AnalysesHandler(_JsonHandler):
+    def _inputs(self) -> Tuple[Dict, Dict, str]:
+        ctype = self.request.headers.get("Content-Type", "")
+        if ctype.startswith("application/json"):
+            try:
+                body = json.loads(self.request.body or b"{}")
+            except ValueError:
+                raise tornado.web.HTTPError(400, reason="Body is not valid JSON")
+            if not isinstance(body, dict):
+                raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+            cv, jd = {"text": body.get("cv_text") or ""}, {"text": body.get("jd_text") or ""}
+            mode = body.get("mode") or self.get_query_argument("mode", "fast")
+        else:
+            files = self.request.files
+            if "cv" not in files:
+                raise tornado.web.HTTPError(400, reason="Missing 'cv' file")
+            f = files["cv"][0]
+            cv = {"data": f.body, "name": f.filename}
+            if "jd" in files:
+                f = files["jd"][0]
+                jd = {"data": f.body, "name": f.filename}
+            else:
+                jd = {"text": self.get_body_argument("jd_text", "")}
+            mode = self.get_argument("mode", "fast")
+        if mode not in AUDIT_MODES:
+            raise tornado.web.HTTPError(400, reason=f"mode must be one of {', '.join(AUDIT_MODES)}")
+        if ("text" in cv and not cv["text"].strip()) or ("text" in jd and not jd["text"].strip()):
+            raise tornado.web.HTTPError(400, reason="Both a CV and a JD are required")
+        return cv, jd, mode
+
+    async def post(self):
+        cv, jd, mode = self._inputs()
+        try:
+            analysis_id, fut = await self.service.submit(cv, jd, mode)
+        except Busy:
+            # not an HTTPError: send_error would drop the Retry-After header
+            self.set_header("Retry-After", str(RETRY_AFTER_S))
+            self.send(429, {"error": "Too many analyses in progress"})
+            return
+        if fut is not None and self.get_argument("wait", "1") != "0":
+            try:
+                # shielded: a client that goes away does not cancel the analysis
+                await asyncio.shield(fut)
+            except Exception:
+                pass  # recorded by the service; reported by send_result
+        await self.send_result(analysis_id)
+
+
+class AnalysisHandler(_JsonHandler):
+    async def get(self, analysis_id: str):
+        await self.send_result(analysis_id)
+
+
+class HealthHandler(_JsonHandler):
+    def get(self):
+        self.send(200, {"status": "ok", "pending": self.service.pending,
+                        "max_pending": self.service.max_pending,
+                        "bank_version": get_bank(reload=False).version})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(telemetry.prometheus_text())
+
+
+def make_app(service: Optional[AnalysisService] = None) -> tornado.web.Application:
+    service = service or AnalysisService()
+    args = {"service": service}
+    return tornado.web.Application([
+        (r"/v1/analyses", AnalysesHandler, args),
+        (r"/v1/analyses/([0-9a-f]{32})", AnalysisHandler, args),
+        (r"/healthz", HealthHandler, args),
+        (r"/metrics", MetricsHandler),
+    ])
+
+
+async def serve(port: int, address: str = "", service: Optional[AnalysisService] = None):
+    get_bank().matcher  # compile before the first request, not during it
+    app = make_app(service)
+    app.listen(port, address, max_body_size=MAX_UPLOAD_MB * 1024 * 1024)
+    await asyncio.Event().wait()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Serve the CV/JD analysis API over HTTP.")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--address", default="")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="concurrent analyses")
+    ap.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                    help="queued + running analyses before answering 429 (default 4 x workers)")
+    args = ap.parse_args(argv)
+    service = AnalysisService(args.workers, args.max_pending)
+    try:
+        asyncio.run(serve(args.port, args.address, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,9 @@
 # utils/ats_check.py
 import os
 import re
-from typing import Dict, Any, List
-import pdfplumber
+from typing import Dict, Any, List, Optional
+from utils import telemetry
+from utils.document import PdfDocument, parse_pdf
 
 EMAIL_RE = re.compile(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", re.I)
 PHONE_RE = re.compile(r"\+?\d[\d\-\s()]{6,}\d")
@@ -36,35 +37,29 @@ def _text_sections(text: str) -> Dict[str, Any]:
             missing.append(h)
     return {"found": found, "missing": missing}
 
-def _detect_columns(chars) -> bool:
+def _detect_columns(x_bins: List[int]) -> bool:
     # Heuristic: if significant text appears in two dominant x-bands, likely multi‑column
-    if not chars:
+    n = sum(x_bins)
+    if n < 100:
         return False
-    xs = [c["x0"] for c in chars if "x0" in c]
-    if len(xs) < 100:
-        return False
-    xs.sort()
-    # bucket into 20px bins
-    bins = {}
-    for x in xs:
-        key = int(x // 20)
-        bins[key] = bins.get(key, 0) + 1
-    # count peaks
-    peaks = [v for v in bins.values() if v > max(20, len(xs) * 0.02)]
+    # count peaks over the 20px bins
+    peaks = [v for v in x_bins if v > max(20, n * 0.02)]
     return len(peaks) >= 2
 
-def _font_variety(chars) -> int:
-    fonts = set()
-    for c in chars:
-        fn = c.get("fontname")
-        if fn:
-            fonts.add(fn.split("+")[-1])
-    return len(fonts)
-
-def ats_audit(uploaded_pdf) -> Dict[str, Any]:
-    """Run ATS‑style checks on a PDF file-like (Streamlit upload)."""
+@telemetry.timed("ats_audit")
+def ats_audit(uploaded_pdf, mode: Optional[str] = None, time_budget_s: Optional[float] = None,
+              max_pages: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run ATS‑style checks on a PDF file-like (Streamlit upload) or on a
+    PdfDocument already produced by utils.document.parse_pdf. `mode` and the
+    budgets only apply when parsing here; see parse_pdf. In "fast" mode
+    tables are not looked for and "tables" is None.
+    """
     results: Dict[str, Any] = {
+        "mode": "fast",
+        "truncated": False,
         "pages": 0,
+        "pages_scanned": 0,
         "tables": 0,
         "images": 0,
         "multi_column": False,
@@ -75,59 +70,48 @@ def ats_audit(uploaded_pdf) -> Dict[str, Any]:
         "warnings": []
     }
 
-    # filename hygiene
-    if hasattr(uploaded_pdf, "name"):
-        results["filename"] = _filename_hygiene(uploaded_pdf.name)
+    if isinstance(uploaded_pdf, PdfDocument):
+        doc = uploaded_pdf
+    else:
+        doc = parse_pdf(uploaded_pdf, mode=mode, time_budget_s=time_budget_s, max_pages=max_pages)
 
-    # open and scan
-    try:
-        with pdfplumber.open(uploaded_pdf) as pdf:
-            results["pages"] = len(pdf.pages)
-            all_chars = []
-            for page in pdf.pages:
-                # tables
-                try:
-                    tables = page.find_tables() or []
-                    results["tables"] += len(tables)
-                except Exception:
-                    pass
-                # images
-                try:
-                    results["images"] += len(page.images or [])
-                except Exception:
-                    pass
-                try:
-                    all_chars.extend(page.chars or [])
-                except Exception:
-                    pass
+    # filename hygiene
+    if doc.name:
+        results["filename"] = _filename_hygiene(doc.name)
 
-            # columns & fonts
-            results["multi_column"] = _detect_columns(all_chars)
-            results["font_families"] = _font_variety(all_chars)
+    results["mode"] = doc.mode
+    results["truncated"] = doc.truncated
+    results["pages"] = doc.pages
+    results["pages_scanned"] = doc.pages_scanned
+    results["tables"] = doc.tables if doc.mode == "deep" else None
+    results["images"] = doc.images
 
-            # text for contacts/sections
-            full_text = ""
-            for page in pdf.pages:
-                try:
-                    tt = page.extract_text() or ""
-                    full_text += tt + "\n"
-                except Exception:
-                    pass
-            if EMAIL_RE.search(full_text):
-                results["contacts"]["email"] = True
-            if PHONE_RE.search(full_text):
-                results["contacts"]["phone"] = True
-            results["sections"] = _text_sections(full_text)
+    # columns & fonts
+    results["multi_column"] = _detect_columns(doc.x_bins)
+    results["font_families"] = len(doc.fonts)
 
-    except Exception as e:
-        results["warnings"].append(f"PDF read error: {e}")
+    if doc.error:
+        results["warnings"].append(f"PDF read error: {doc.error}")
+    else:
+        # text for contacts/sections
+        full_text = "\n".join(doc.page_texts)
+        if EMAIL_RE.search(full_text):
+            results["contacts"]["email"] = True
+        if PHONE_RE.search(full_text):
+            results["contacts"]["phone"] = True
+        results["sections"] = _text_sections(full_text)
+    if doc.truncated:
+        results["warnings"].append(
+            f"Layout checked on {doc.pages_scanned} of {doc.pages} pages (audit budget); "
+            "font, image and table counts are partial."
+        )
 
     # high‑level warnings
     if results["multi_column"]:
         results["warnings"].append("Detected multi‑column layout. Some ATS parsers struggle with columns.")
     if results["font_families"] > 4:
         results["warnings"].append("Many font families detected. Keep fonts minimal (<= 3).")
-    if results["tables"] > 0:
+    if results["tables"]:
         results["warnings"].append("Tables detected. Prefer simple bullet points for ATS.")
     if results["images"] > 0:
         results["warnings"].append("Images/icons detected. ATS may ignore image text.")
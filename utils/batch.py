@@ -0,0 +1,346 @@
+# utils/batch.py
+"""
+Rank a pool of CVs against one JD.
+
+    python -m utils.batch jd.pdf applicants/ --top-k 50 --out ranked.csv
+    python -m utils.batch jd.txt applicants.zip --workers 8 --out ranked.jsonl
+
+The JD is extracted and vectorised once; CVs are streamed from a directory
+or a zip/tar archive and scored in a process pool whose workers build the
+skill matcher once at start-up. Each row carries the skill score, the text
+similarity (utils.similarity) and their blend; `rank_by` picks the one the
+ranking uses. Only the best `top_k` rows are kept, in a bounded heap.
+
+With a dedup threshold (utils.dedup, on by default) byte-identical CVs are
+not parsed again, and a CV whose MinHash signature matches an earlier one
+at or above the threshold reuses that CV's skill analysis: its row is the
+earlier row with its own name and text similarity plus `duplicate_of`.
+Near-duplicates still have their text read, but skip extraction and
+scoring. `clusters` collects representative -> duplicates.
+
+Pass a utils.results_store.ResultStore to keep every row, not just the top
+k, for exports and aggregate queries.
+"""
+import argparse
+import csv
+import functools
+import heapq
+import io
+import json
+import os
+import sys
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.cache import content_hash
+from utils.dedup import THRESHOLD, MinHashIndex, signature
+from utils.pdf_reader import extract_text_from_pdf
+from utils.results_store import ResultStore
+from utils.similarity import blend, similarity_scores, vectorize
+from utils.skill_bank import SkillBank, get_bank
+from utils.skill_extractor import compare_skill_sets, extract_skills
+
+CV_EXTENSIONS = (".pdf", ".txt")
+RANK_BY = ("score", "blended", "similarity")
+
+_JD_SKILLS: Set[str] = set()
+_JD_VEC = None
+_BANK: Optional[SkillBank] = None
+
+
+def read_document(name: str, data: bytes) -> str:
+    """Text of a PDF or UTF-8 text file given its name and bytes."""
+    if name.lower().endswith(".pdf"):
+        f = io.BytesIO(data)
+        f.name = name
+        return extract_text_from_pdf(f)
+    return data.decode("utf-8", errors="ignore")
+
+
+def _cv_members(source: str) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """(name, read) for every CV in a directory, .zip or .tar(.gz) archive."""
+    if os.path.isdir(source):
+        def read_file(path: str) -> bytes:
+            with open(path, "rb") as f:
+                return f.read()
+        for root, _, files in os.walk(source):
+            for fn in sorted(files):
+                if fn.lower().endswith(CV_EXTENSIONS):
+                    path = os.path.join(root, fn)
+                    yield os.path.relpath(path, source), functools.partial(read_file, path)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(CV_EXTENSIONS):
+                    yield info.filename, functools.partial(zf.read, info)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as tf:
+            for member in tf:
+                if member.isfile() and member.name.lower().endswith(CV_EXTENSIONS):
+                    yield member.name, lambda m=member: tf.extractfile(m).read()
+    else:
+        raise ValueError(f"Not a directory or zip/tar archive: {source}")
+
+
+def iter_cv_sources(source: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for every CV in a directory, .zip or .tar(.gz) archive."""
+    for name, read in _cv_members(source):
+        yield name, read()
+
+
+def list_cv_sources(source: str) -> Iterator[str]:
+    """Names iter_cv_sources would yield for `source`, without reading the CVs."""
+    for name, _ in _cv_members(source):
+        yield name
+
+
+def _init_worker(bank: SkillBank, jd_skills: Set[str], jd_vec):
+    # Runs once per worker process: install the parent's compiled bank (one
+    # unpickle, matcher included) so the whole run scores on one version.
+    global _BANK, _JD_SKILLS, _JD_VEC
+    _BANK, _JD_SKILLS, _JD_VEC = bank, jd_skills, jd_vec
+
+
+def _error_row(name: str, err: Exception) -> Dict:
+    return {"name": name, "score": 0.0, "similarity": 0.0, "blended": 0.0, "error": str(err)}
+
+
+def _jd_similarity(text: str) -> float:
+    return round(float(similarity_scores(_JD_VEC, vectorize([text]))[0, 0]), 2)
+
+
+def _score_one(name: str, data: bytes) -> Dict:
+    try:
+        text = read_document(name, data)
+    except Exception as e:
+        return _error_row(name, e)
+    return _score_text(name, text, _jd_similarity(text))
+
+
+def _read_one(name: str, data: bytes) -> Dict:
+    """First pass with dedup on: text, MinHash signature and JD similarity."""
+    try:
+        text = read_document(name, data)
+        return {"name": name, "text": text, "sig": signature(text),
+                "similarity": _jd_similarity(text)}
+    except Exception as e:
+        return _error_row(name, e)
+
+
+def _score_text(name: str, text: str, sim: float) -> Dict:
+    try:
+        res = compare_skill_sets(extract_skills(text, _BANK), _JD_SKILLS, _BANK)
+    except Exception as e:
+        return _error_row(name, e)
+    return _score_row(name, res, sim)
+
+
+def _score_row(name: str, res: Dict, sim: float) -> Dict:
+    return {
+        "name": name,
+        "score": res["score"],
+        "similarity": sim,
+        "blended": blend(res["score"], sim),
+        "matched": res["matched"],
+        "missing": res["missing"],
+        "category_breakdown": res["category_breakdown"],
+        "error": "",
+    }
+
+
+def rank_cvs(jd_text: str, cvs: Iterable[Tuple[str, bytes]], top_k: int = 50,
+             workers: Optional[int] = None, max_in_flight: Optional[int] = None,
+             rank_by: str = "score", dedup_threshold: Optional[float] = THRESHOLD,
+             clusters: Optional[Dict[str, List[str]]] = None, store=None,
+             role: str = "") -> List[Dict]:
+    """
+    Score every (name, bytes) CV against `jd_text` and return the `top_k` best
+    rows, highest `rank_by` first. At most `max_in_flight` CVs are held in memory.
+    `dedup_threshold` (estimated Jaccard, 0 or None = off) turns on duplicate
+    reuse; `clusters`, if given, is filled with representative -> duplicate names.
+    With dedup on, each representative's matched skills are kept until the end
+    so later duplicates can be scored without their text. Every row is also written to `store` (a
+    ResultStore) under `role` when given.
+    """
+    if rank_by not in RANK_BY:
+        raise ValueError(f"rank_by must be one of {', '.join(RANK_BY)}")
+    bank = get_bank()
+    bank.matcher  # compile once here; workers receive it ready-made
+    jd_skills = extract_skills(jd_text, bank)
+    jd_vec = vectorize([jd_text])
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    heap: List[Tuple[float, int, Dict]] = []
+    seq = 0
+
+    def keep(row: Dict):
+        nonlocal seq
+        if store is not None:
+            store.add_row(role, row, commit=False)
+        # (score, -seq): among equal scores the earliest CV wins
+        item = (row[rank_by], -seq, row)
+        seq += 1
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(bank, jd_skills, jd_vec)) as pool:
+        if not dedup_threshold:
+            pending = set()
+            for name, data in cvs:
+                pending.add(pool.submit(_score_one, name, data))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        keep(fut.result())
+            for fut in pending:
+                keep(fut.result())
+        else:
+            _dedup_pass(pool, cvs, keep, max_in_flight, MinHashIndex(dedup_threshold),
+                        clusters if clusters is not None else {}, jd_skills, bank)
+
+    if store is not None:
+        store.commit()
+    ranked = [row for _, _, row in sorted(heap, key=lambda it: it[:2], reverse=True)]
+    for i, row in enumerate(ranked, 1):
+        row["rank"] = i
+    return ranked
+
+
+def _dedup_pass(pool: ProcessPoolExecutor, cvs: Iterable[Tuple[str, bytes]], keep,
+                max_in_flight: int, index: MinHashIndex, clusters: Dict[str, List[str]],
+                jd_skills: Set[str], bank: SkillBank):
+    """Read/sign every CV, then score only those with no duplicate already seen."""
+    by_hash: Dict[str, str] = {}            # content hash -> representative
+    # representative -> (similarity, matched skills as positions in jd_list, error);
+    # a duplicate's row is rebuilt from these, the full row is not held
+    jd_list = sorted(jd_skills)
+    jd_pos = {s: i for i, s in enumerate(jd_list)}
+    reps: Dict[str, Tuple[float, Tuple[int, ...], str]] = {}
+    # duplicates whose representative is still being scored: (name, sim, jaccard)
+    waiting: Dict[str, List[Tuple[str, Optional[float], float]]] = {}
+    pending: Dict = {}                       # future -> "read" | "score"
+
+    def duplicate_row(rep: str, name: str, sim: Optional[float], jaccard: float) -> Dict:
+        rep_sim, matched, error = reps[rep]
+        if error:
+            row = {"name": name, "score": 0.0, "similarity": 0.0, "blended": 0.0, "error": error}
+        else:
+            # the CV's matched skills score exactly as its full skill set did
+            res = compare_skill_sets({jd_list[i] for i in matched}, jd_skills, bank)
+            row = _score_row(name, res, rep_sim if sim is None else sim)
+        row.update(duplicate_of=rep, dup_similarity=jaccard)
+        return row
+
+    def attach(name: str, rep: str, sim: Optional[float], jaccard: float):
+        clusters.setdefault(rep, []).append(name)
+        if rep in reps:
+            keep(duplicate_row(rep, name, sim, jaccard))
+        else:
+            waiting.setdefault(rep, []).append((name, sim, jaccard))
+
+    def handle(fut):
+        kind, res = pending.pop(fut), fut.result()
+        name = res["name"]
+        if kind == "score" or "error" in res:
+            reps[name] = (res["similarity"], tuple(jd_pos[s] for s in res.get("matched", ())),
+                          res["error"])
+            keep(res)
+            for dup, sim, jaccard in waiting.pop(name, ()):
+                keep(duplicate_row(name, dup, sim, jaccard))
+            return
+        text = res.pop("text")                 # not kept past scoring
+        match = index.closest(res["sig"]) if res["sig"] is not None else None
+        if match is not None:
+            attach(name, match[0], res["similarity"], match[1])
+            return
+        if res["sig"] is not None:
+            index.add(name, res["sig"])
+        pending[pool.submit(_score_text, name, text, res["similarity"])] = "score"
+
+    def drain(until: int):
+        while len(pending) > until:
+            done, _ = wait(set(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                handle(fut)
+
+    for name, data in cvs:
+        h = content_hash(data)
+        if h in by_hash:
+            attach(name, by_hash[h], None, 1.0)   # byte-identical: not even parsed
+            continue
+        by_hash[h] = name
+        pending[pool.submit(_read_one, name, data)] = "read"
+        drain(max_in_flight - 1)
+    drain(0)
+
+
+def write_jsonl(rows: List[Dict], out):
+    for row in rows:
+        out.write(json.dumps(row) + "\n")
+
+
+def write_csv(rows: List[Dict], out):
+    cats = sorted({c for row in rows for c in row.get("category_breakdown", {})})
+    writer = csv.writer(out)
+    writer.writerow(["rank", "name", "score", "similarity", "blended", "matched", "missing"]
+                    + cats + ["duplicate_of", "error"])
+    for row in rows:
+        bd = row.get("category_breakdown", {})
+        writer.writerow(
+            [row["rank"], row["name"], row["score"], row["similarity"], row["blended"],
+             len(row.get("matched", [])), len(row.get("missing", []))]
+            + [f"{bd[c]['matched']}/{bd[c]['jd_total']}" if c in bd else "" for c in cats]
+            + [row.get("duplicate_of", ""), row.get("error", "")]
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Rank CVs against one job description.")
+    ap.add_argument("jd", help="JD file (.pdf or .txt)")
+    ap.add_argument("cvs", help="directory or .zip/.tar archive of CVs (.pdf/.txt)")
+    ap.add_argument("--top-k", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--rank-by", choices=RANK_BY, default="score",
+                    help="skill score, text similarity, or their blend")
+    ap.add_argument("--dedup-threshold", type=float, default=THRESHOLD,
+                    help="MinHash Jaccard at which a CV reuses an earlier one's analysis (0 = off)")
+    ap.add_argument("--clusters", help="write duplicate clusters (representative -> copies) as JSON")
+    ap.add_argument("--store", help="also keep every row in this results store (SQLite)")
+    ap.add_argument("--role", help="role name for --store (default: the JD file name)")
+    ap.add_argument("--out", default="-", help="output .csv or .jsonl (default: JSONL to stdout)")
+    args = ap.parse_args(argv)
+
+    with open(args.jd, "rb") as f:
+        jd_text = read_document(args.jd, f.read())
+    clusters: Dict[str, List[str]] = {}
+    store = ResultStore(args.store) if args.store else None
+    try:
+        rows = rank_cvs(jd_text, iter_cv_sources(args.cvs), top_k=args.top_k, workers=args.workers,
+                        rank_by=args.rank_by, dedup_threshold=args.dedup_threshold,
+                        clusters=clusters, store=store,
+                        role=args.role or os.path.basename(args.jd))
+    finally:
+        if store is not None:
+            store.close()
+    if clusters:
+        print(f"{sum(map(len, clusters.values()))} duplicate CVs in {len(clusters)} clusters",
+              file=sys.stderr)
+    if args.clusters:
+        with open(args.clusters, "w", encoding="utf-8") as f:
+            json.dump(clusters, f, indent=2)
+
+    if args.out == "-":
+        write_jsonl(rows, sys.stdout)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as out:
+            (write_csv if args.out.lower().endswith(".csv") else write_jsonl)(rows, out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
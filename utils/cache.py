@@ -0,0 +1,270 @@
+# utils/cache.py
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Union
+
+from utils.ats_check import ats_audit
+from utils.document import AUDIT_MODE, DOC_SCHEMA, PdfDocument, parse_pdf
+from utils.parser_preview import pdf_text_preview
+from utils.skill_bank import SkillBank, get_bank
+from utils.skill_extractor import extract_skills, extract_skills_incremental
+
+_MISS = object()
+JD_HISTORY = int(os.environ.get("CVSENSE_JD_HISTORY", 8))
+
+
+def content_hash(data: Union[bytes, str]) -> str:
+    """sha256 of file bytes or text; the identity every cache entry is keyed on."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier memo for analysis results.
+
+    Tier 1 is a bounded in-memory LRU. Tier 2 (optional) is a SQLite file
+    that survives restarts and is trimmed to `disk_max_items`, dropping the
+    least recently used rows. Values must be picklable and should be treated
+    as read-only by callers, since memory hits return the stored object.
+    """
+
+    def __init__(self, max_items: int = 256, disk_path: Optional[str] = None,
+                 disk_max_items: int = 10_000):
+        self.max_items = max_items
+        self.disk_path = disk_path
+        self.disk_max_items = disk_max_items
+        self._mem: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.counters: Dict[str, int] = {
+            "hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0,
+        }
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries(used)")
+            self._db.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["memory_hits"] += 1
+                return self._mem[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    value = pickle.loads(row[0])
+                    self._remember(key, value)
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                    return value
+            self.counters["misses"] += 1
+            return default
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)",
+                    (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time()),
+                )
+                self._db.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_items,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, value: Any):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def memo(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISS)
+        if value is _MISS:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+            out["memory_items"] = len(self._mem)
+            if self._db is not None:
+                out["disk_items"] = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return out
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+
+_cache: Optional[AnalysisCache] = None
+
+
+def configure_cache(max_items: Optional[int] = None, disk_path: Optional[str] = None,
+                    disk_max_items: Optional[int] = None) -> AnalysisCache:
+    """
+    (Re)build the process-wide cache. Unset arguments fall back to
+    CVSENSE_CACHE_ITEMS, CVSENSE_CACHE_DB and CVSENSE_CACHE_DB_ITEMS;
+    without a DB path the cache is memory-only.
+    """
+    global _cache
+    _cache = AnalysisCache(
+        max_items=max_items or int(os.environ.get("CVSENSE_CACHE_ITEMS", 256)),
+        disk_path=disk_path or os.environ.get("CVSENSE_CACHE_DB") or None,
+        disk_max_items=disk_max_items or int(os.environ.get("CVSENSE_CACHE_DB_ITEMS", 10_000)),
+    )
+    return _cache
+
+
+def get_cache() -> AnalysisCache:
+    return _cache or configure_cache()
+
+
+def _key(kind: str, version: str, *parts: str) -> str:
+    return ":".join((kind, version) + parts)
+
+
+# --------- memoized pipeline stages ---------
+# Parses and ATS audits do not depend on the skills bank and are keyed on the
+# document schema only. The skill wrappers take the bank once, so the key's
+# version and the version used to compute the value agree across a hot reload.
+def cached_parse_pdf(data: bytes, name: str = "", mode: Optional[str] = None,
+                     isolated: bool = False) -> PdfDocument:
+    # isolated=True parses in the utils.ingest process pool (timeouts, memory
+    # limit) instead of this thread. A parse cut short by a budget or timeout
+    # is returned but not stored, so a load spike does not pin a partial
+    # document in the cache.
+    mode = mode or AUDIT_MODE
+    key = _key("pdf", str(DOC_SCHEMA), mode, content_hash(data), name)
+    cache = get_cache()
+    doc = cache.get(key, _MISS)
+    if doc is _MISS:
+        if isolated:
+            from utils.ingest import get_pool
+            doc = get_pool().parse(data, name, mode)
+        else:
+            f = io.BytesIO(data)
+            f.name = name
+            doc = parse_pdf(f, mode=mode)
+        if not doc.truncated:
+            cache.put(key, doc)
+    return doc
+
+
+def cached_extract_skills(text: str, bank: Optional[SkillBank] = None) -> Set[str]:
+    bank = bank or get_bank()
+    return get_cache().memo(
+        _key("skills", bank.version, content_hash(text)), lambda: extract_skills(text, bank)
+    )
+
+
+def cached_ats_audit(data: bytes, name: str = "", mode: Optional[str] = None,
+                     isolated: bool = False) -> Dict[str, Any]:
+    mode = mode or AUDIT_MODE
+    key = _key("ats", str(DOC_SCHEMA), mode, content_hash(data), name)
+    cache = get_cache()
+    res = cache.get(key, _MISS)
+    if res is _MISS:
+        res = ats_audit(cached_parse_pdf(data, name, mode, isolated))
+        if not res["truncated"]:
+            cache.put(key, res)
+    return res
+
+
+# --------- CV / JD profiles ---------
+# An analysis is a cheap set comparison between two halves memoized on their
+# own, so editing the JD never recomputes anything on the CV side.
+# Recent JD profiles per caller ("session_key"), so one user's JDs are never
+# the diff base for, or evict, another's. At most JD_SESSIONS keys are kept.
+JD_SESSIONS = 256
+_recent_jds: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _doc_hash(doc: PdfDocument) -> str:
+    return content_hash(repr((
+        doc.text, doc.pages, doc.pages_scanned, sorted(doc.fonts), doc.x_bins, doc.images, doc.tables,
+    )))
+
+
+def cached_cv_profile(cv_doc: Optional[PdfDocument], cv_text: str, cv_hash: Optional[str] = None,
+                      bank: Optional[SkillBank] = None) -> Dict[str, Any]:
+    """
+    Skills, ATS audit and parse preview of a CV. `cv_doc` is the parsed PDF,
+    or None for a text CV (no audit; the preview is the text). `cv_hash` is
+    the content hash of the uploaded bytes; without it the key is a hash of
+    the document's text and the fields the audit reads, which is stable
+    across processes (a pickle of the font set is not). Profiles of
+    truncated documents are not stored.
+    """
+    bank = bank or get_bank()
+    if cv_doc is None:
+        ident = ("text", content_hash(cv_text))
+    else:
+        ident = (cv_doc.mode, cv_hash or _doc_hash(cv_doc), cv_doc.name)
+    key = _key("cv", bank.version, str(DOC_SCHEMA), *ident)
+    cache = get_cache()
+    prof = cache.get(key, _MISS)
+    if prof is _MISS:
+        prof = {
+            "skills": cached_extract_skills(cv_text, bank),
+            "ats": ats_audit(cv_doc) if cv_doc is not None else None,
+            "preview": (pdf_text_preview(cv_doc, max_chars=2500) if cv_doc is not None
+                        else cv_text.strip()[:2500]),
+        }
+        if cv_doc is None or not cv_doc.truncated:
+            cache.put(key, prof)
+    return prof
+
+
+def cached_jd_profile(jd_text: str, bank: Optional[SkillBank] = None,
+                      session_key: str = "") -> Dict[str, Any]:
+    """
+    Skills of a JD. A JD not seen before is extracted incrementally against
+    the closest of the last CVSENSE_JD_HISTORY JDs (default 8) analysed
+    under the same `session_key`, so an edit in the "Paste Text" box only
+    rescans the tokens around the change.
+    """
+    bank = bank or get_bank()
+    cache = get_cache()
+    key = _key("jd", bank.version, content_hash(jd_text))
+    prof = cache.get(key, _MISS)
+    with _recent_lock:
+        recent = _recent_jds.pop(session_key, None) or deque(maxlen=JD_HISTORY)
+        _recent_jds[session_key] = recent   # most recently used last
+        while len(_recent_jds) > JD_SESSIONS:
+            _recent_jds.popitem(last=False)
+        previous = [(p["tokens"], p["skills"]) for p in recent if p["version"] == bank.version]
+    if prof is _MISS:
+        skills, tokens = extract_skills_incremental(jd_text, previous, bank)
+        prof = {"version": bank.version, "skills": skills, "tokens": tokens}
+        cache.put(key, prof)
+    with _recent_lock:
+        if not any(p is prof for p in recent):
+            recent.append(prof)
+    return prof
@@ -0,0 +1,189 @@
+# utils/candidate_index.py
+"""
+Persistent skill -> candidate inverted index.
+
+    python -m utils.candidate_index candidates.db add applicants/
+    python -m utils.candidate_index candidates.db query --must airflow databricks --nice mlflow
+
+Postings are stored in SQLite clustered by skill, so a query only reads the
+posting lists of the skills it names and never rescans documents. Candidates
+indexed with an older skills bank are flagged `stale` in results; add them
+again to re-extract.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.skill_bank import get_bank
+from utils.skill_extractor import extract_skills
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    ref TEXT NOT NULL UNIQUE,
+    bank_version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    skill TEXT NOT NULL,
+    candidate INTEGER NOT NULL,
+    PRIMARY KEY (skill, candidate)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_candidate ON postings(candidate);
+"""
+
+
+class CandidateIndex:
+    """Incrementally updated inverted index over canonical skills from skill_extractor."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def add(self, ref: str, skills: Iterable[str], commit: bool = True,
+            bank_version: Optional[str] = None):
+        """Insert or replace one candidate's skill set (extracted with `bank_version`)."""
+        version = bank_version or get_bank().version
+        cur = self.db.execute("SELECT id FROM candidates WHERE ref = ?", (ref,))
+        row = cur.fetchone()
+        if row is None:
+            cid = self.db.execute(
+                "INSERT INTO candidates (ref, bank_version) VALUES (?, ?)", (ref, version)
+            ).lastrowid
+        else:
+            cid = row[0]
+            self.db.execute("UPDATE candidates SET bank_version = ? WHERE id = ?", (version, cid))
+            self.db.execute("DELETE FROM postings WHERE candidate = ?", (cid,))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO postings (skill, candidate) VALUES (?, ?)",
+            [(s, cid) for s in set(skills)],
+        )
+        if commit:
+            self.db.commit()
+
+    def add_text(self, ref: str, text: str, commit: bool = True):
+        bank = get_bank()
+        self.add(ref, extract_skills(text, bank), commit=commit, bank_version=bank.version)
+
+    def stale_refs(self) -> List[str]:
+        """Candidates whose skills were extracted with a different bank version."""
+        return [r[0] for r in self.db.execute(
+            "SELECT ref FROM candidates WHERE bank_version != ? ORDER BY id", (get_bank().version,))]
+
+    def remove(self, ref: str):
+        row = self.db.execute("SELECT id FROM candidates WHERE ref = ?", (ref,)).fetchone()
+        if row is not None:
+            self.db.execute("DELETE FROM postings WHERE candidate = ?", (row[0],))
+            self.db.execute("DELETE FROM candidates WHERE id = ?", (row[0],))
+            self.db.commit()
+
+    def posting(self, skill: str) -> Set[int]:
+        return {r[0] for r in self.db.execute(
+            "SELECT candidate FROM postings WHERE skill = ?", (skill,))}
+
+    def query(self, must: Iterable[str] = (), nice: Iterable[str] = (),
+              limit: Optional[int] = 50) -> List[Dict]:
+        """
+        Candidates holding every `must` skill, ranked by the weighted coverage
+        of must + nice skills (same _CAT_WEIGHTS scoring as analyse_cv_vs_jd,
+        with the query playing the JD). Rows indexed with another bank
+        version carry `stale`: skills it renamed or dropped do not match.
+        """
+        bank = get_bank()
+        must_set = {bank.canon(s) for s in must if s.strip()}
+        nice_set = {bank.canon(s) for s in nice if s.strip()} - must_set
+        wanted = must_set | nice_set
+        if not wanted:
+            return []
+
+        matched: Dict[int, Set[str]] = {}
+        if must_set:
+            # intersect smallest posting list first; stop as soon as it empties
+            lists = sorted((self.posting(s) for s in must_set), key=len)
+            cands = lists[0]
+            for p in lists[1:]:
+                if not cands:
+                    break
+                cands &= p
+            if not cands:
+                return []
+            matched = {c: set(must_set) for c in cands}
+        for s in nice_set:
+            p = self.posting(s)
+            for c in (p & matched.keys() if must_set else p):
+                matched.setdefault(c, set()).add(s)
+
+        denom = sum(bank.weight(s) for s in wanted) or 1.0
+        scored = sorted(
+            ((round(100.0 * sum(bank.weight(s) for s in hit) / denom, 2), c, hit)
+             for c, hit in matched.items()),
+            key=lambda t: (-t[0], t[1]),
+        )
+        if limit:
+            scored = scored[:limit]
+        refs = self._refs([c for _, c, _ in scored])
+        return [
+            {"ref": refs[c][0], "score": score, "matched": sorted(hit),
+             "missing": sorted(wanted - hit), "stale": refs[c][1] != bank.version}
+            for score, c, hit in scored
+        ]
+
+    def _refs(self, ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        """id -> (ref, bank_version)."""
+        out: Dict[int, Tuple[str, str]] = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            out.update((cid, (ref, version)) for cid, ref, version in self.db.execute(
+                f"SELECT id, ref, bank_version FROM candidates "
+                f"WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from utils.batch import iter_cv_sources, read_document
+
+    ap = argparse.ArgumentParser(description="Build and query the candidate skill index.")
+    ap.add_argument("db", help="SQLite index file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add", help="index CVs from a directory or zip/tar archive")
+    add.add_argument("cvs")
+    q = sub.add_parser("query", help="boolean/weighted skill query")
+    q.add_argument("--must", nargs="*", default=[])
+    q.add_argument("--nice", nargs="*", default=[])
+    q.add_argument("--limit", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    index = CandidateIndex(args.db)
+    try:
+        if args.cmd == "add":
+            n = 0
+            for name, data in iter_cv_sources(args.cvs):
+                try:
+                    index.add_text(name, read_document(name, data), commit=False)
+                    n += 1
+                except Exception as e:
+                    print(f"skipped {name}: {e}", file=sys.stderr)
+            index.db.commit()
+            print(f"indexed {n} CVs ({len(index)} total)", file=sys.stderr)
+        else:
+            for row in index.query(args.must, args.nice, limit=args.limit):
+                print(json.dumps(row))
+            stale = index.stale_refs()
+            if stale:
+                print(f"{len(stale)} CVs were indexed with an older skills bank; "
+                      f"run `add` on their source again to refresh them", file=sys.stderr)
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# utils/dedup.py
+"""
+Near-duplicate detection for CV pools.
+
+    sig = signature(text)
+    index = MinHashIndex(threshold=0.9)
+    match = index.closest(sig)      # (key, estimated Jaccard) or None
+    if match is None:
+        index.add(name, sig)
+
+A signature is the MinHash of the set of word 3-shingles of the text as
+normalised for extraction (_tokens), with NUM_PERM hash functions drawn
+from a fixed seed, so signatures from different processes are comparable.
+The index splits signatures into LSH bands; a query only looks at the
+buckets its own bands fall in, and candidates are kept when the estimated
+Jaccard similarity reaches the threshold. Bands and rows are chosen for
+the threshold, erring towards extra candidates over missed duplicates.
+"""
+import functools
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.skill_extractor import _tokens
+
+NUM_PERM = 128
+SHINGLE = 3
+SEED = 1
+THRESHOLD = float(os.environ.get("CVSENSE_DEDUP_THRESHOLD", 0.9))
+_PRIME = 4294967291                    # largest prime below 2**32
+
+
+@functools.lru_cache(maxsize=None)
+def _permutations(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def shingles(text: str, k: int = SHINGLE) -> np.ndarray:
+    """Distinct 32-bit hashes of the word k-shingles of `text` (one shingle if shorter)."""
+    tokens = _tokens(text)
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    n = max(1, len(tokens) - k + 1)
+    return np.unique(np.fromiter(
+        (zlib.crc32(" ".join(tokens[i:i + k]).encode("utf-8")) for i in range(n)),
+        dtype=np.uint64, count=n,
+    ))
+
+
+def signature(text: str, num_perm: int = NUM_PERM, seed: int = SEED) -> Optional[np.ndarray]:
+    """MinHash signature of `text`, or None when it has no tokens."""
+    x = shingles(text)
+    if not x.size:
+        return None
+    a, b = _permutations(num_perm, seed)
+    # universal hashing mod a 32-bit prime: a, b, x < 2**32, so a * x + b
+    # stays within 64 bits and the result is uniform over [0, _PRIME)
+    return ((a * x + b) % np.uint64(_PRIME)).min(axis=1)
+
+
+def _lsh_params(threshold: float, num_perm: int, miss_weight: float = 0.8) -> Tuple[int, int]:
+    """
+    (bands, rows) minimising the weighted area of missed and spurious
+    candidates. Misses weigh more: a spurious candidate only costs one
+    signature comparison, a missed duplicate a whole analysis.
+    """
+    grid = np.linspace(0.0, 1.0, 201)
+    best, best_err = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1.0 - (1.0 - grid ** rows) ** bands     # chance a pair becomes a candidate
+        err = np.where(grid < threshold, (1.0 - miss_weight) * p, miss_weight * (1.0 - p)).mean()
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+class MinHashIndex:
+    """Banded LSH over MinHash signatures, keyed by caller-chosen names."""
+
+    def __init__(self, threshold: float = THRESHOLD, num_perm: int = NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._sigs: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def _band_keys(self, sig: np.ndarray):
+        r = self.rows
+        return (sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands))
+
+    def add(self, key: str, sig: np.ndarray):
+        if key in self._sigs:
+            raise KeyError(f"{key!r} is already indexed")
+        self._sigs[key] = sig
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, sig: np.ndarray) -> List[Tuple[str, float]]:
+        """Indexed keys whose estimated Jaccard with `sig` reaches the threshold, best first."""
+        cands = set()
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            cands.update(bucket.get(band, ()))
+        out = []
+        for key in cands:
+            jac = float(np.mean(self._sigs[key] == sig))
+            if jac >= self.threshold:
+                out.append((key, round(jac, 3)))
+        out.sort(key=lambda kv: (-kv[1], kv[0]))
+        return out
+
+    def closest(self, sig: np.ndarray) -> Optional[Tuple[str, float]]:
+        found = self.query(sig)
+        return found[0] if found else None
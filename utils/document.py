@@ -0,0 +1,124 @@
+# utils/document.py
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+import pdfplumber
+from utils import telemetry
+
+# Width of the x0 bands used for the multi-column heuristic, and how many
+# bands the histogram keeps (x0 past the last band is counted in it)
+X_BIN_WIDTH = 20
+X_BINS = 64
+
+# Bump when PdfDocument's fields change, so cached parses are not reused
+DOC_SCHEMA = 4
+
+# "fast" reads text, fonts, images and layout only; "deep" also runs
+# pdfplumber's table finder, by far the most expensive call per page.
+AUDIT_MODES = ("fast", "deep")
+AUDIT_MODE = os.environ.get("CVSENSE_AUDIT_MODE", "fast")
+
+# Per-document budgets for the ATS signals (0 = unlimited). Once one is hit,
+# the remaining pages are only read for text: the document comes back with
+# truncated=True and partial layout/font/image/table counts, but its text,
+# which skill extraction reads, is always complete.
+TIME_BUDGET_S = float(os.environ.get("CVSENSE_AUDIT_TIME_BUDGET_S", 20))
+MAX_PAGES = int(os.environ.get("CVSENSE_AUDIT_MAX_PAGES", 50))
+
+
+@dataclass
+class PdfDocument:
+    """
+    Everything the app needs from one PDF, gathered in a single pdfplumber
+    pass: per-page text, a fixed-size histogram of char x-positions, the font
+    set and image counts (plus tables in deep mode). Pages are folded in one
+    at a time and released, so only the text grows with page count. ATS
+    audit, parse preview and skill extraction all read from this instead of
+    reopening the file.
+    """
+    name: str = ""
+    mode: str = "fast"
+    pages: int = 0
+    pages_scanned: int = 0
+    truncated: bool = False
+    page_texts: List[str] = field(default_factory=list)
+    x_bins: List[int] = field(default_factory=lambda: [0] * X_BINS)
+    fonts: Set[str] = field(default_factory=set)
+    tables: int = 0
+    images: int = 0
+    error: str = ""
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.page_texts).strip()
+
+
+@telemetry.timed("parse_pdf")
+def parse_pdf(uploaded_pdf, mode: Optional[str] = None, time_budget_s: Optional[float] = None,
+              max_pages: Optional[int] = None) -> PdfDocument:
+    """
+    Parse a PDF file-like (Streamlit upload, path or stream) once.
+
+    Budgets are checked between pages and only limit the ATS signals; text
+    is read from every page. A single pathological page can still overrun;
+    utils.ingest is what bounds a worker outright.
+    """
+    mode = mode or AUDIT_MODE
+    if mode not in AUDIT_MODES:
+        raise ValueError(f"Unknown audit mode {mode!r}; expected one of {AUDIT_MODES}")
+    time_budget_s = TIME_BUDGET_S if time_budget_s is None else time_budget_s
+    max_pages = MAX_PAGES if max_pages is None else max_pages
+    doc = PdfDocument(name=os.path.basename(getattr(uploaded_pdf, "name", "") or ""), mode=mode)
+    deadline = time.monotonic() + time_budget_s if time_budget_s else None
+    try:
+        with pdfplumber.open(uploaded_pdf) as pdf:
+            doc.pages = len(pdf.pages)
+            for page in pdf.pages:
+                if not doc.truncated and ((max_pages and doc.pages_scanned >= max_pages) or (
+                        deadline and time.monotonic() >= deadline)):
+                    doc.truncated = True
+                try:
+                    if doc.truncated:
+                        _read_text(page, doc)
+                    else:
+                        _scan_page(page, doc)
+                        doc.pages_scanned += 1
+                finally:
+                    # drop the page's parsed layout, chars and text map
+                    page.close()
+                telemetry.count("pages_parsed")
+    except Exception as e:
+        doc.error = str(e) or type(e).__name__
+    return doc
+
+
+def _scan_page(page, doc: PdfDocument):
+    if doc.mode == "deep":
+        try:
+            with telemetry.stage("table_detection"):
+                doc.tables += len(page.find_tables() or [])
+        except Exception:
+            pass
+    try:
+        doc.images += len(page.images or [])
+    except Exception:
+        pass
+    try:
+        x_bins, last = doc.x_bins, X_BINS - 1
+        for c in page.chars or []:
+            if "x0" in c:
+                x_bins[min(max(int(c["x0"] // X_BIN_WIDTH), 0), last)] += 1
+            fn = c.get("fontname")
+            if fn:
+                doc.fonts.add(fn.split("+")[-1])
+    except Exception:
+        pass
+    _read_text(page, doc)
+
+
+def _read_text(page, doc: PdfDocument):
+    try:
+        doc.page_texts.append(page.extract_text() or "")
+    except Exception:
+        doc.page_texts.append("")
@@ -0,0 +1,216 @@
+# utils/ingest.py
+"""
+Isolated PDF ingestion.
+
+pdfplumber is pure-Python and GIL-bound, and a malformed PDF can spin or
+exhaust memory. IngestPool runs parse_pdf in long-lived worker processes:
+every task has a wall-clock timeout (the worker is killed and replaced),
+every worker runs under an address-space limit, and workers are recycled
+after `max_tasks` documents. Results come back as PdfDocument, which is
+plain picklable data; failures come back as a PdfDocument with `error` set.
+
+    pool = get_pool()
+    doc = pool.parse(data, "cv.pdf")
+    for name, doc in pool.map(iter_cv_sources("applicants/")): ...
+"""
+import io
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Iterable, Iterator, Optional, Tuple
+
+from utils.document import PdfDocument, parse_pdf
+
+try:
+    import resource
+except ImportError:  # not on Windows; the memory limit is skipped there
+    resource = None
+
+TIMEOUT_S = float(os.environ.get("CVSENSE_INGEST_TIMEOUT_S", 60))
+MEMORY_MB = int(os.environ.get("CVSENSE_INGEST_MEMORY_MB", 1024))
+MAX_TASKS = int(os.environ.get("CVSENSE_INGEST_MAX_TASKS", 100))
+
+
+def _worker_main(conn, memory_mb: int):
+    # Runs in the child: cap the address space, then parse until told to stop.
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        name, data, mode = task
+        try:
+            f = io.BytesIO(data)
+            f.name = name
+            doc = parse_pdf(f, mode=mode)
+        except MemoryError:
+            doc = PdfDocument(name=name, mode=mode or "", error="Out of memory while parsing")
+        del task, data
+        conn.send(doc)
+
+
+class _Slot:
+    """One worker process and the thread that feeds it tasks."""
+
+    def __init__(self, pool: "IngestPool"):
+        self.pool = pool
+        self.proc = None
+        self.conn = None
+        self.done = 0
+        self.thread = threading.Thread(target=self.run, name="cvsense-ingest", daemon=True)
+        self.thread.start()
+
+    def _spawn(self):
+        parent, child = self.pool._ctx.Pipe()
+        self.proc = self.pool._ctx.Process(
+            target=_worker_main, args=(child, self.pool.memory_mb), daemon=True
+        )
+        self.proc.start()
+        child.close()
+        self.conn, self.done = parent, 0
+        self.pool.counters["spawned"] += 1
+
+    def _retire(self, kill: bool = False):
+        if self.proc is None:
+            return
+        if kill:
+            self.proc.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.proc.join(5)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+        self.proc = self.conn = None
+
+    def run(self):
+        while True:
+            item = self.pool._tasks.get()
+            if item is None:
+                self._retire()
+                return
+            fut, name, data, mode = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                doc = self._parse(name, data, mode)
+            except Exception as e:
+                # e.g. a reply that fails to unpickle: the pipe is in an unknown
+                # state, so drop the worker; the next task spawns a fresh one
+                try:
+                    self._retire(kill=True)
+                except Exception:
+                    self.proc = self.conn = None
+                self.pool.counters["crashes"] += 1
+                doc = PdfDocument(name=os.path.basename(name), mode=mode or "",
+                                  error=f"PDF worker crashed ({type(e).__name__}: {e})")
+            # always resolved: callers (the Streamlit script thread included) block on it
+            fut.set_result(doc)
+
+    def _parse(self, name: str, data: bytes, mode: Optional[str]) -> PdfDocument:
+        if self.proc is None:
+            self._spawn()
+        try:
+            self.conn.send((name, data, mode))
+            if self.conn.poll(self.pool.timeout_s or None):
+                doc = self.conn.recv()
+                self.done += 1
+            else:
+                self._retire(kill=True)
+                self.pool.counters["timeouts"] += 1
+                # truncated: a retry may well finish, so callers must not cache it
+                doc = PdfDocument(name=os.path.basename(name), mode=mode or "", truncated=True,
+                                  error=f"Timed out after {self.pool.timeout_s:g}s")
+        except (EOFError, OSError):
+            self.proc.join(1)
+            code = self.proc.exitcode
+            self._retire(kill=True)
+            self.pool.counters["crashes"] += 1
+            return PdfDocument(name=os.path.basename(name), mode=mode or "",
+                               error=f"PDF worker crashed (exit code {code})")
+        if self.proc is not None and self.done >= self.pool.max_tasks:
+            self._retire()
+            self.pool.counters["recycled"] += 1
+        return doc
+
+
+class IngestPool:
+    """Process pool for parse_pdf with per-task timeouts, memory limits and recycling."""
+
+    def __init__(self, workers: Optional[int] = None, timeout_s: float = TIMEOUT_S,
+                 memory_mb: int = MEMORY_MB, max_tasks: int = MAX_TASKS):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout_s = timeout_s
+        self.memory_mb = memory_mb
+        self.max_tasks = max(1, max_tasks)
+        # spawn, not fork: the app process has threads (Streamlit, executors)
+        self._ctx = mp.get_context("spawn")
+        self._tasks: "queue.Queue" = queue.Queue()
+        self.counters = {"spawned": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        self._slots = [_Slot(self) for _ in range(self.workers)]
+        self._closed = False
+
+    def submit(self, data: bytes, name: str = "", mode: Optional[str] = None) -> "Future[PdfDocument]":
+        if self._closed:
+            raise RuntimeError("IngestPool is closed")
+        fut: "Future[PdfDocument]" = Future()
+        self._tasks.put((fut, name, data, mode))
+        return fut
+
+    def parse(self, data: bytes, name: str = "", mode: Optional[str] = None) -> PdfDocument:
+        return self.submit(data, name, mode).result()
+
+    def map(self, items: Iterable[Tuple[str, bytes]], mode: Optional[str] = None,
+            max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, PdfDocument]]:
+        """Parse (name, bytes) items in order, holding at most `max_in_flight` in memory."""
+        max_in_flight = max_in_flight or self.workers * 2
+        pending = []
+        for name, data in items:
+            pending.append((name, self.submit(data, name, mode)))
+            if len(pending) >= max_in_flight:
+                n, fut = pending.pop(0)
+                yield n, fut.result()
+        for n, fut in pending:
+            yield n, fut.result()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._slots:
+            self._tasks.put(None)
+        for slot in self._slots:
+            slot.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pool: Optional[IngestPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> IngestPool:
+    """Process-wide pool, sized by CVSENSE_INGEST_WORKERS (default: CPU count)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = IngestPool(workers=int(os.environ.get("CVSENSE_INGEST_WORKERS", 0)) or None)
+        return _pool
@@ -0,0 +1,195 @@
+# utils/jd_catalogue.py
+"""
+Score CVs against a whole catalogue of job descriptions at once.
+
+    python -m utils.jd_catalogue roles.db add open_roles/
+    python -m utils.jd_catalogue roles.db match cv.pdf --top 10
+
+Each JD's extracted skills are stored once in SQLite. In memory the
+catalogue is a (JDs x skills) matrix of category weights, so a CV, or a
+batch of CVs, is scored against every role with one matrix product. Only
+the top-N rows get the full analyse_cv_vs_jd breakdown. JDs extracted with
+an older skills bank are still matched but flagged `stale`; add them again
+to re-extract.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils.skill_bank import SkillBank, get_bank
+from utils.skill_extractor import compare_skill_vectors, extract_skills, skill_vector
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jds (
+    id INTEGER PRIMARY KEY,
+    ref TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    bank_version TEXT NOT NULL,
+    skills TEXT NOT NULL
+);
+"""
+
+
+class JdCatalogue:
+    """Stored JD skill sets plus a weighted skill matrix rebuilt per bank version."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self._lock = threading.Lock()
+        self._matrix = None   # (bank version, ids, refs, titles, stale, jd bool matrix, weighted, denom)
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM jds").fetchone()[0]
+
+    def add(self, ref: str, skills: Iterable[str], title: str = "", commit: bool = True,
+            bank_version: Optional[str] = None):
+        """Insert or replace one JD's skill set (extracted with `bank_version`)."""
+        self.db.execute(
+            "INSERT INTO jds (ref, title, bank_version, skills) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(ref) DO UPDATE SET title = excluded.title, "
+            "bank_version = excluded.bank_version, skills = excluded.skills",
+            (ref, title, bank_version or get_bank().version, json.dumps(sorted(set(skills)))),
+        )
+        if commit:
+            self.db.commit()
+        self._matrix = None
+
+    def add_text(self, ref: str, text: str, title: str = "", commit: bool = True):
+        bank = get_bank()
+        self.add(ref, extract_skills(text, bank), title, commit=commit, bank_version=bank.version)
+
+    def stale_refs(self, bank: Optional[SkillBank] = None) -> List[str]:
+        """JDs whose skills were extracted with a different bank version."""
+        version = (bank or get_bank()).version
+        return [r[0] for r in self.db.execute(
+            "SELECT ref FROM jds WHERE bank_version != ? ORDER BY id", (version,))]
+
+    def remove(self, ref: str):
+        self.db.execute("DELETE FROM jds WHERE ref = ?", (ref,))
+        self.db.commit()
+        self._matrix = None
+
+    def _load(self, bank: SkillBank):
+        with self._lock:
+            cached = self._matrix
+            if cached is not None and cached[0] == bank.version:
+                return cached
+            ids, refs, titles, stale, rows = [], [], [], [], []
+            for jid, ref, title, version, skills in self.db.execute(
+                    "SELECT id, ref, title, bank_version, skills FROM jds ORDER BY id"):
+                ids.append(jid)
+                refs.append(ref)
+                titles.append(title)
+                # skills the current bank dropped or renamed fall out here
+                stale.append(version != bank.version)
+                rows.append(skill_vector(json.loads(skills), bank))
+            jd = np.array(rows, dtype=bool).reshape(len(rows), len(bank.skill_list))
+            weighted = jd * bank.weight_arr            # (JDs x skills) category weights
+            denom = weighted.sum(axis=1)
+            denom[denom == 0] = 1.0                    # same guard as compare_skill_vectors
+            self._matrix = (bank.version, ids, refs, titles, stale, jd, weighted, denom)
+            return self._matrix
+
+    def scores(self, cvs: np.ndarray, bank: Optional[SkillBank] = None) -> np.ndarray:
+        """(CVs x JDs) weighted coverage in percent for a stack of CV skill vectors."""
+        bank = bank or get_bank()
+        _, _, _, _, _, _, weighted, denom = self._load(bank)
+        return 100.0 * (np.atleast_2d(cvs).astype(np.float64) @ weighted.T) / denom
+
+    def match_many(self, cv_skills: List[Iterable[str]], top_n: int = 10,
+                   bank: Optional[SkillBank] = None) -> List[List[Dict]]:
+        """
+        Best `top_n` roles for each CV skill set, highest score first, each
+        row carrying analyse_cv_vs_jd's fields for that CV/JD pair, and
+        `stale` when the JD was extracted with another bank version.
+        """
+        bank = bank or get_bank()
+        _, ids, refs, titles, stale, jd, _, _ = self._load(bank)
+        if not cv_skills:
+            return []
+        cvs = np.array([skill_vector(s, bank) for s in cv_skills], dtype=bool)
+        if not ids:
+            return [[] for _ in cv_skills]
+        all_scores = self.scores(cvs, bank)
+        k = min(top_n, len(ids))
+        out = []
+        for cv, row in zip(cvs, all_scores):
+            top = np.argpartition(-row, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+            # score desc, then catalogue order among ties
+            top = sorted(top, key=lambda i: (-row[i], i))
+            ranked = []
+            for rank, i in enumerate(top, 1):
+                res = compare_skill_vectors(cv, jd[i], bank=bank)
+                ranked.append({
+                    "rank": rank,
+                    "ref": refs[i],
+                    "title": titles[i],
+                    "score": res["score"],
+                    "matched": res["matched"],
+                    "missing": res["missing"],
+                    "category_breakdown": res["category_breakdown"],
+                    "stale": stale[i],
+                })
+            out.append(ranked)
+        return out
+
+    def match(self, cv_skills: Iterable[str], top_n: int = 10,
+              bank: Optional[SkillBank] = None) -> List[Dict]:
+        return self.match_many([cv_skills], top_n, bank)[0]
+
+    def match_text(self, cv_text: str, top_n: int = 10) -> List[Dict]:
+        bank = get_bank()
+        return self.match(extract_skills(cv_text, bank), top_n, bank)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from utils.batch import iter_cv_sources, read_document
+
+    ap = argparse.ArgumentParser(description="Build a JD catalogue and match CVs against it.")
+    ap.add_argument("db", help="SQLite catalogue file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add", help="add JDs from a directory or zip/tar archive")
+    add.add_argument("jds")
+    m = sub.add_parser("match", help="best-fitting roles for a CV")
+    m.add_argument("cv", help="CV file (.pdf or .txt)")
+    m.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    cat = JdCatalogue(args.db)
+    try:
+        if args.cmd == "add":
+            n = 0
+            for name, data in iter_cv_sources(args.jds):
+                try:
+                    cat.add_text(name, read_document(name, data), commit=False)
+                    n += 1
+                except Exception as e:
+                    print(f"skipped {name}: {e}", file=sys.stderr)
+            cat.db.commit()
+            print(f"added {n} JDs ({len(cat)} total)", file=sys.stderr)
+        else:
+            with open(args.cv, "rb") as f:
+                cv_text = read_document(args.cv, f.read())
+            for row in cat.match_text(cv_text, args.top):
+                print(json.dumps(row))
+            stale = cat.stale_refs()
+            if stale:
+                print(f"{len(stale)} JDs were extracted with an older skills bank; "
+                      f"run `add` on their source again to refresh them", file=sys.stderr)
+    finally:
+        cat.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+# utils/jobs.py
+"""
+Durable bulk screening: a local job queue in SQLite, no broker.
+
+    python -m utils.jobs screen.db submit jd.pdf applicants/ --role "Data Engineer"
+    python -m utils.jobs screen.db work --workers 8
+    python -m utils.jobs screen.db status
+    python -m utils.results_store screen.db export --out report.csv
+
+`submit` records a run (role, JD text, audit mode) and one job per CV in a
+directory or zip/tar archive; CV bytes stay where they are. `work` leases
+jobs in chunks, parses PDFs in a utils.ingest pool sized by --workers
+(timeouts, memory limit, crash isolation) and runs the pipeline on each
+document in a second pool of --workers processes: extract_text_from_pdf ->
+skill analysis against the run's JD (extracted once) -> ats_audit ->
+craft_suggestions, plus text similarity.
+Each result is written to the utils.results_store tables in the same
+database, in the same transaction that marks its job done, so a finished
+CV is never analysed again however the process stops.
+
+Leases expire after CVSENSE_JOBS_LEASE_S (default 300) and are renewed
+while a worker is alive, so the jobs of a crashed worker go back to the
+queue; on this host, leases of dead processes are reclaimed at once.
+Failures are retried with exponential backoff up to
+CVSENSE_JOBS_MAX_ATTEMPTS (default 3); unreadable or empty documents fail
+straight away. Re-running `work` resumes where the last one stopped, and
+several `work` processes may share one database.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import sys
+import tarfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils import telemetry
+from utils.ats_check import ats_audit
+from utils.batch import list_cv_sources, read_document
+from utils.document import AUDIT_MODE, AUDIT_MODES, PdfDocument
+from utils.ingest import IngestPool
+from utils.pdf_reader import extract_text_from_pdf
+from utils.results_store import ResultStore
+from utils.similarity import blend, similarity_scores, vectorize
+from utils.skill_bank import SkillBank, get_bank
+from utils.skill_extractor import compare_skill_sets, extract_skills
+from utils.suggestions import craft_suggestions
+
+LEASE_S = float(os.environ.get("CVSENSE_JOBS_LEASE_S", 300))
+MAX_ATTEMPTS = int(os.environ.get("CVSENSE_JOBS_MAX_ATTEMPTS", 3))
+RETRY_BACKOFF_S = float(os.environ.get("CVSENSE_JOBS_RETRY_BACKOFF_S", 30))
+CHUNK = int(os.environ.get("CVSENSE_JOBS_CHUNK", 32))
+PROGRESS_S = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    role TEXT NOT NULL,
+    jd_text TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,        -- directory or archive the CV is read from
+    state TEXT NOT NULL DEFAULT 'queued',   -- queued | leased | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    finished REAL,
+    suggestions TEXT,
+    error TEXT NOT NULL DEFAULT '',
+    UNIQUE (run, name)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(run, state, available_at);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs(owner) WHERE owner IS NOT NULL;
+"""
+
+
+class _Sources:
+    """Reads one CV by (source, name), keeping archives open between reads."""
+
+    def __init__(self):
+        self._open: Dict[str, object] = {}
+
+    def read(self, source: str, name: str) -> bytes:
+        if os.path.isdir(source):
+            with open(os.path.join(source, name), "rb") as f:
+                return f.read()
+        arc = self._open.get(source)
+        if arc is None:
+            arc = zipfile.ZipFile(source) if zipfile.is_zipfile(source) else tarfile.open(source)
+            self._open[source] = arc
+        if isinstance(arc, zipfile.ZipFile):
+            return arc.read(name)
+        f = arc.extractfile(name)
+        if f is None:
+            raise ValueError(f"{name} is not a file in {source}")
+        return f.read()
+
+    def close(self):
+        for arc in self._open.values():
+            arc.close()
+        self._open.clear()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True   # exists but not ours
+    return True
+
+
+class JobQueue:
+    """Runs and their jobs, stored next to the ResultStore tables in one SQLite file."""
+
+    def __init__(self, path: str, lease_s: float = LEASE_S, max_attempts: int = MAX_ATTEMPTS,
+                 retry_backoff_s: float = RETRY_BACKOFF_S):
+        self.store = ResultStore(path)
+        self.db = self.store.db
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff_s = retry_backoff_s
+        self.host = socket.gethostname()
+        self.owner = f"{self.host}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def close(self):
+        self.store.close()
+
+    # --------- runs ---------
+    def create_run(self, name: str, jd_text: str, role: Optional[str] = None,
+                   mode: Optional[str] = None) -> int:
+        """Create run `name`, or return it if it exists with the same JD and mode."""
+        mode = mode or AUDIT_MODE
+        row = self.db.execute("SELECT id, jd_text, mode FROM runs WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            if (row[1], row[2]) != (jd_text, mode):
+                raise ValueError(f"Run {name!r} exists with a different JD or audit mode")
+            return row[0]
+        rid = self.db.execute(
+            "INSERT INTO runs (name, role, jd_text, mode, created) VALUES (?, ?, ?, ?, ?)",
+            (name, role or name, jd_text, mode, time.time()),
+        ).lastrowid
+        self.db.commit()
+        return rid
+
+    def runs(self) -> List[Dict]:
+        cur = self.db.execute("SELECT id, name, role, jd_text, mode FROM runs ORDER BY id")
+        return [{"id": i, "name": n, "role": r, "jd_text": jd, "mode": m} for i, n, r, jd, m in cur]
+
+    def run(self, name: str) -> Dict:
+        for r in self.runs():
+            if r["name"] == name:
+                return r
+        raise KeyError(f"No run named {name!r}")
+
+    def enqueue(self, run_id: int, source: str, batch: int = 1000) -> int:
+        """Add a job per CV in `source`; CVs already in the run are skipped. Returns how many were added."""
+        source = os.path.abspath(source)
+        added, names = 0, []
+
+        def flush():
+            nonlocal added
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO jobs (run, name, source) VALUES (?, ?, ?)",
+                [(run_id, n, source) for n in names],
+            )
+            added += self.db.total_changes - before
+            names.clear()
+
+        for name in list_cv_sources(source):
+            names.append(name)
+            if len(names) >= batch:
+                flush()
+        flush()
+        self.db.commit()
+        return added
+
+    # --------- leasing ---------
+    def reclaim_dead(self) -> int:
+        """Requeue jobs leased by processes on this host that no longer exist."""
+        n = 0
+        for (owner,) in self.db.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE state = 'leased'").fetchall():
+            host, _, rest = owner.partition(":")
+            pid = rest.partition(":")[0]
+            if host == self.host and owner != self.owner and pid.isdigit() and not _pid_alive(int(pid)):
+                n += self.db.execute(
+                    "UPDATE jobs SET state = 'queued', owner = NULL, lease_until = NULL "
+                    "WHERE owner = ? AND state = 'leased'", (owner,)).rowcount
+        self.db.commit()
+        return n
+
+    def lease(self, run_id: int, n: int) -> List[Dict]:
+        """Claim up to `n` ready jobs (queued, or leased by someone whose lease ran out)."""
+        now = time.time()
+        self.db.commit()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # a job whose every lease ran out is probably killing its workers
+            self.db.execute(
+                "UPDATE jobs SET state = 'failed', owner = NULL, finished = ?, "
+                "error = 'lease expired on every attempt' "
+                "WHERE run = ? AND state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, run_id, now, self.max_attempts))
+            rows = self.db.execute(
+                "SELECT id, name, source, attempts FROM jobs "
+                "WHERE run = ? AND state = 'leased' AND lease_until < ? LIMIT ?",
+                (run_id, now, n)).fetchall()
+            rows += self.db.execute(
+                "SELECT id, name, source, attempts FROM jobs "
+                "WHERE run = ? AND state = 'queued' AND available_at <= ? LIMIT ?",
+                (run_id, now, n - len(rows))).fetchall()
+            self.db.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?", [(self.owner, now + self.lease_s, r[0]) for r in rows])
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            raise
+        return [{"id": i, "name": name, "source": src, "attempts": a + 1} for i, name, src, a in rows]
+
+    def renew(self):
+        """Push back the expiry of every lease this queue holds."""
+        self.db.execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND state = 'leased'",
+                        (time.time() + self.lease_s, self.owner))
+        self.db.commit()
+
+    def release(self):
+        """Hand this queue's unfinished leases back without counting the attempt."""
+        self.db.execute(
+            "UPDATE jobs SET state = 'queued', owner = NULL, lease_until = NULL, "
+            "attempts = MAX(attempts - 1, 0) WHERE owner = ? AND state = 'leased'", (self.owner,))
+        self.db.commit()
+
+    # --------- outcomes ---------
+    def complete(self, run: Dict, job: Dict, results: Dict, ats: Optional[Dict],
+                 sim: float, suggestions: List[str]) -> bool:
+        """
+        Store the result and mark the job done in one transaction. False (and
+        nothing stored) when this queue no longer holds the job's lease.
+        """
+        marked = self.db.execute(
+            "UPDATE jobs SET state = 'done', owner = NULL, lease_until = NULL, finished = ?, "
+            "suggestions = ?, error = '' WHERE id = ? AND owner = ? AND state = 'leased'",
+            (time.time(), "\n".join(suggestions), job["id"], self.owner)).rowcount
+        if marked != 1:
+            self.db.rollback()
+            return False
+        self.store.add(run["role"], job["name"], results, ats, sim, blend(results["score"], sim),
+                       commit=False)
+        self.db.commit()
+        return True
+
+    def fail(self, job: Dict, error: str, permanent: bool = False) -> Optional[bool]:
+        """
+        Record a failure; requeue with backoff unless permanent or out of
+        attempts. True if retried, False if failed for good, None when this
+        queue no longer holds the job's lease (nothing is changed).
+        """
+        retry = not permanent and job["attempts"] < self.max_attempts
+        now = time.time()
+        if retry:
+            changed = self.db.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL, lease_until = NULL, "
+                "available_at = ?, error = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (now + self.retry_backoff_s * 2 ** (job["attempts"] - 1), error, job["id"],
+                 self.owner)).rowcount
+        else:
+            changed = self.db.execute(
+                "UPDATE jobs SET state = 'failed', owner = NULL, lease_until = NULL, finished = ?, "
+                "error = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (now, error, job["id"], self.owner)).rowcount
+        self.db.commit()
+        return retry if changed == 1 else None
+
+    def retry_failed(self, run_id: int) -> int:
+        n = self.db.execute(
+            "UPDATE jobs SET state = 'queued', attempts = 0, available_at = 0, finished = NULL, "
+            "error = '' WHERE run = ? AND state = 'failed'", (run_id,)).rowcount
+        self.db.commit()
+        return n
+
+    def next_available(self, run_id: int) -> Optional[float]:
+        """When the next queued job (e.g. one backing off) becomes ready, or None if none is queued."""
+        return self.db.execute("SELECT MIN(available_at) FROM jobs WHERE run = ? AND state = 'queued'",
+                               (run_id,)).fetchone()[0]
+
+    def progress(self, run_id: int, window_s: float = 300.0) -> Dict:
+        """Jobs per state, recent throughput (finished per second over `window_s`) and ETA."""
+        counts = dict(self.db.execute(
+            "SELECT state, COUNT(*) FROM jobs WHERE run = ? GROUP BY state", (run_id,)))
+        out = {s: counts.get(s, 0) for s in ("queued", "leased", "done", "failed")}
+        out["total"] = sum(out.values())
+        recent = self.db.execute(
+            "SELECT COUNT(*), MIN(finished) FROM jobs "
+            "WHERE run = ? AND state IN ('done', 'failed') AND finished >= ?",
+            (run_id, time.time() - window_s)).fetchone()
+        span = time.time() - recent[1] if recent[0] else 0.0
+        out["rate_per_s"] = round(recent[0] / span, 2) if span > 1 else 0.0
+        left = out["queued"] + out["leased"]
+        out["eta_s"] = round(left / out["rate_per_s"]) if out["rate_per_s"] else None
+        return out
+
+
+# --------- worker ---------
+class _Pipeline:
+    """The per-CV analysis for one run, with the JD extracted and vectorised once."""
+
+    def __init__(self, run: Dict, bank: Optional[SkillBank] = None):
+        self.bank = bank or get_bank()
+        self.jd_skills = extract_skills(run["jd_text"], self.bank)
+        self.jd_vec = vectorize([run["jd_text"]])
+
+    def __call__(self, parsed) -> Tuple[Dict, Optional[Dict], float, List[str]]:
+        if isinstance(parsed, PdfDocument):
+            if parsed.error and not parsed.text:
+                # timeouts and worker crashes may pass on a retry; a broken file will not
+                if parsed.truncated or parsed.error.startswith("PDF worker crashed"):
+                    raise RuntimeError(parsed.error)
+                raise ValueError(f"Could not read PDF: {parsed.error}")
+            text, ats = extract_text_from_pdf(parsed), ats_audit(parsed)
+        else:
+            text, ats = parsed, None
+        if not text.strip():
+            raise ValueError("No text in document")
+        results = compare_skill_sets(extract_skills(text, self.bank), self.jd_skills, self.bank)
+        suggestions = craft_suggestions(results, self.bank.skills_by_cat, ats or {},
+                                        skill_cat=self.bank.skill_cat)
+        sim = round(float(similarity_scores(self.jd_vec, vectorize([text]))[0, 0]), 2)
+        return results, ats, sim, suggestions
+
+
+_PIPELINE: Optional[_Pipeline] = None
+
+
+def _init_analyser(pipeline: _Pipeline):
+    # Runs once per analysis process: the parent's pipeline arrives with the
+    # compiled bank and the extracted JD, so workers never rebuild either.
+    global _PIPELINE
+    _PIPELINE = pipeline
+
+
+def _analyse(parsed) -> Tuple[Dict, Optional[Dict], float, List[str]]:
+    return _PIPELINE(parsed)
+
+
+def work(queue: JobQueue, run: Dict, workers: Optional[int] = None, chunk: int = CHUNK,
+         report: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Process `run` until no job is left to lease. PDFs are parsed by an
+    IngestPool of `workers` processes and every CV is then analysed in a
+    second pool of `workers` processes; this process only reads sources
+    and commits results. About `chunk` jobs are leased at a time. `report`
+    is called with queue.progress() plus this session's counts every
+    PROGRESS_S seconds and once at the end.
+    """
+    bank = get_bank()
+    bank.matcher  # compile once here; analysis workers receive it ready-made
+    pipeline = _Pipeline(run, bank)
+    sources = _Sources()
+    pool = IngestPool(workers=workers)
+    # spawn, like the ingest pool: this process runs the ingest feeder threads
+    analysers = ProcessPoolExecutor(max_workers=pool.workers, mp_context=mp.get_context("spawn"),
+                                    initializer=_init_analyser, initargs=(pipeline,))
+    stats = {"processed": 0, "session_failed": 0, "retried": 0}
+    started = last_report = last_renew = time.monotonic()
+    in_flight: Dict[Future, Tuple[str, Dict]] = {}   # future -> ("parse" | "analyse", job)
+
+    def snapshot() -> Dict:
+        elapsed = time.monotonic() - started
+        return {**queue.progress(run["id"]), **stats, "elapsed_s": round(elapsed, 1),
+                "session_rate_per_s": round(stats["processed"] / elapsed, 2) if elapsed else 0.0}
+
+    def finish(fut: Future, job: Dict):
+        try:
+            outcome = fut.result()
+        except Exception as e:
+            retried = queue.fail(job, f"{type(e).__name__}: {e}", permanent=isinstance(e, ValueError))
+            if retried is None:
+                telemetry.count("jobs_lease_lost")
+                return
+            stats["retried" if retried else "session_failed"] += 1
+            telemetry.count("jobs_retried" if retried else "jobs_failed")
+            return
+        if not queue.complete(run, job, *outcome):
+            # the lease ran out and another worker has the job now
+            telemetry.count("jobs_lease_lost")
+            return
+        stats["processed"] += 1
+        telemetry.count("jobs_done")
+
+    queue.reclaim_dead()
+    try:
+        while True:
+            if len(in_flight) <= pool.workers:
+                for job in queue.lease(run["id"], chunk):
+                    try:
+                        data = sources.read(job["source"], job["name"])
+                    except (OSError, KeyError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+                        fut: Future = Future()
+                        fut.set_exception(ValueError(f"Could not read {job['name']}: {e}"))
+                        in_flight[fut] = ("analyse", job)
+                        continue
+                    if job["name"].lower().endswith(".pdf") or data[:5] == b"%PDF-":
+                        fut = pool.submit(data, os.path.basename(job["name"]), run["mode"])
+                        in_flight[fut] = ("parse", job)
+                    else:
+                        fut = analysers.submit(_analyse, data.decode("utf-8", errors="ignore"))
+                        in_flight[fut] = ("analyse", job)
+            if not in_flight:
+                ready = queue.next_available(run["id"])
+                if ready is None:
+                    break
+                time.sleep(min(max(ready - time.time(), 0.1), PROGRESS_S))
+            else:
+                done, _ = wait(list(in_flight), timeout=PROGRESS_S, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    step, job = in_flight.pop(fut)
+                    if step == "parse":
+                        in_flight[analysers.submit(_analyse, fut.result())] = ("analyse", job)
+                    else:
+                        finish(fut, job)
+            now = time.monotonic()
+            if now - last_renew > queue.lease_s / 3:
+                queue.renew()
+                last_renew = now
+            if report is not None and now - last_report > PROGRESS_S:
+                report(snapshot())
+                last_report = now
+    finally:
+        # interrupted: whatever is still in flight goes back to the queue
+        queue.release()
+        analysers.shutdown(cancel_futures=True)
+        pool.close()
+        sources.close()
+    out = snapshot()
+    if report is not None:
+        report(out)
+    return out
+
+
+def _print_progress(p: Dict):
+    eta = "?" if p["eta_s"] is None else time.strftime("%H:%M:%S", time.gmtime(p["eta_s"]))
+    print(f"{p['done']}/{p['total']} done, {p['failed']} failed, {p['queued'] + p['leased']} left | "
+          f"this session {p['processed']} in {p['elapsed_s']}s "
+          f"({p['session_rate_per_s']} CV/s) | ETA {eta}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Queue and run bulk CV screening with resume.")
+    ap.add_argument("db", help="SQLite queue + results file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sb = sub.add_parser("submit", help="create a run and queue the CVs of a directory or archive")
+    sb.add_argument("jd", help="JD file (.pdf or .txt)")
+    sb.add_argument("cvs", help="directory or .zip/.tar archive of CVs (.pdf/.txt)")
+    sb.add_argument("--run", help="run name (default: --role, else the JD file name)")
+    sb.add_argument("--role", help="role name in the results store (default: the run name)")
+    sb.add_argument("--mode", choices=AUDIT_MODES, default=None, help="ATS audit tier")
+    wk = sub.add_parser("work", help="process queued jobs; run again to resume")
+    wk.add_argument("--run", help="only this run (default: every run, oldest first)")
+    wk.add_argument("--workers", type=int, default=None,
+                    help="PDF parsing and analysis processes, each (default: CPU count)")
+    wk.add_argument("--chunk", type=int, default=CHUNK, help="jobs leased at a time")
+    st = sub.add_parser("status", help="progress per run")
+    st.add_argument("--run")
+    rt = sub.add_parser("retry", help="requeue the failed jobs of a run")
+    rt.add_argument("--run", required=True)
+    args = ap.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    try:
+        if args.cmd == "submit":
+            with open(args.jd, "rb") as f:
+                jd_text = read_document(args.jd, f.read())
+            name = args.run or args.role or os.path.basename(args.jd)
+            run_id = queue.create_run(name, jd_text, args.role, args.mode)
+            added = queue.enqueue(run_id, args.cvs)
+            print(f"run {name!r}: queued {added} new CVs ({queue.progress(run_id)['total']} total)",
+                  file=sys.stderr)
+        elif args.cmd == "work":
+            for run in ([queue.run(args.run)] if args.run else queue.runs()):
+                print(f"run {run['name']!r}", file=sys.stderr)
+                work(queue, run, args.workers, args.chunk, report=_print_progress)
+        elif args.cmd == "status":
+            for run in ([queue.run(args.run)] if args.run else queue.runs()):
+                p = queue.progress(run["id"])
+                print(f"{run['name']}: " + ", ".join(f"{k} {v}" for k, v in p.items()))
+        else:
+            print(f"requeued {queue.retry_failed(queue.run(args.run)['id'])} failed jobs", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("interrupted; run `work` again to resume", file=sys.stderr)
+        return 130
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,26 @@
 # utils/parser_preview.py
-import pdfplumber
+from utils import telemetry
+from utils.pdf_reader import iter_page_text
 
+@telemetry.timed("pdf_text_preview")
 def pdf_text_preview(uploaded_pdf, max_chars: int = 2500) -> str:
     """
     Return a plain-text preview (simulated ATS parse).
-    Reads all pages, concatenates text, trims to max_chars.
+    Reads pages only until max_chars of text are in hand, then trims.
+    Accepts a PDF file-like or an already parsed PdfDocument.
     """
     if not uploaded_pdf:
         return ""
     text = []
+    size = 0
     try:
-        with pdfplumber.open(uploaded_pdf) as pdf:
-            for p in pdf.pages:
-                try:
-                    t = p.extract_text() or ""
-                    text.append(t)
-                except Exception:
-                    pass
+        for t in iter_page_text(uploaded_pdf):
+            text.append(t)
+            size += len(t) + 1
+            # cheap bound first; the strip check is exact (nothing later can
+            # change the first max_chars chars or bring the length back down)
+            if size > max_chars and len("\n".join(text).strip()) > max_chars:
+                break
     except Exception:
         return ""
     full = "\n".join(text).strip()
@@ -1,8 +1,29 @@
+from typing import Iterator
 import pdfplumber
+from utils import telemetry
+from utils.document import PdfDocument
 
-def extract_text_from_pdf(uploaded_file):
-    text = ""
+def iter_page_text(uploaded_file) -> Iterator[str]:
+    """
+    Yield each page's text in order, "" for empty or unreadable pages.
+    Pages are opened lazily and released once read, so a consumer that stops
+    early never touches the rest of the file.
+    """
+    if isinstance(uploaded_file, PdfDocument):
+        yield from uploaded_file.page_texts
+        return
     with pdfplumber.open(uploaded_file) as pdf:
         for page in pdf.pages:
-            text += page.extract_text() + "\n"
-    return text.strip()
+            try:
+                yield page.extract_text() or ""
+            except Exception:
+                yield ""
+            finally:
+                page.close()
+                telemetry.count("pages_parsed")
+
+@telemetry.timed("extract_text")
+def extract_text_from_pdf(uploaded_file):
+    if isinstance(uploaded_file, PdfDocument):
+        return uploaded_file.text
+    return "\n".join(iter_page_text(uploaded_file)).strip()
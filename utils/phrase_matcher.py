@@ -0,0 +1,80 @@
+# utils/phrase_matcher.py
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# Same notion of a "word character" as the (?<![A-Za-z0-9]) / (?![A-Za-z0-9])
+# guards the per-skill regexes used to apply.
+_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases.
+
+    Built once, then every phrase occurrence that sits on word boundaries is
+    found in a single left-to-right scan, so cost is linear in the text length
+    regardless of how many phrases the bank holds.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self.phrases: Set[str] = set()
+        for ph in phrases:
+            self._insert(ph)
+        self._link()
+
+    def _insert(self, phrase: str):
+        if not phrase or phrase in self.phrases:
+            return
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (phrase,)
+        self.phrases.add(phrase)
+
+    def _link(self):
+        # BFS so every state's failure target is finalised before its children
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, phrase) for every word-bounded occurrence, overlaps included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        n = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            if end < n and text[end] in _WORD_CHARS:
+                continue
+            for ph in out[state]:
+                start = end - len(ph)
+                if start > 0 and text[start - 1] in _WORD_CHARS:
+                    continue
+                yield start, end, ph
+
+    def search(self, text: str) -> Set[str]:
+        """Distinct phrases that occur in ``text`` on word boundaries."""
+        return {ph for _, _, ph in self.finditer(text)}
@@ -0,0 +1,95 @@
+# utils/report.py
+"""
+The analysis bundle behind "Analyse": match results, ATS audit, suggestions,
+narrative, parse preview and the Markdown report. Shared by the Streamlit
+app and the HTTP API so both return the same structure.
+"""
+from typing import Dict, Optional
+
+from utils.cache import cached_ats_audit, cached_cv_profile, cached_jd_profile, content_hash
+from utils.narrative import recruiter_narrative
+from utils.similarity import blend, similarity
+from utils.skill_bank import get_bank
+from utils.skill_extractor import compare_skill_sets, skill_spans
+from utils.suggestions import craft_suggestions
+
+
+def build_report(results: Dict, ats: Optional[Dict], narrative: str,
+                 sim: Optional[float] = None) -> str:
+    report_md = []
+    report_md.append(f"# CVSense Pro Report\n")
+    report_md.append(f"**Score:** {results['score']}%\n")
+    if sim is not None:
+        report_md.append(f"**Text similarity:** {sim}% (blended score {blend(results['score'], sim)}%)\n")
+    report_md.append("## Category Coverage\n")
+    for cat, d in results["category_breakdown"].items():
+        pct = round(100.0 * d["matched"] / d["jd_total"], 1) if d["jd_total"] else 0.0
+        report_md.append(f"- {cat.replace('_',' ')}: {d['matched']}/{d['jd_total']} ({pct}%)")
+    report_md.append("\n## Matched Skills\n" + (", ".join(results["matched"]) or "None"))
+    report_md.append("\n## Missing Skills\n" + (", ".join(results["missing"]) or "None"))
+    report_md.append("\n## Extra Skills\n" + (", ".join(results["extra"]) or "None"))
+    if ats is None:
+        report_md.append("\n## ATS Warnings\nNot checked (no PDF)")
+    else:
+        report_md.append("\n## ATS Warnings\n" + ("\n".join(f"- {w}" for w in ats["warnings"]) or "None"))
+    report_md.append("\n## Narrative\n" + narrative)
+    return "\n".join(report_md)
+
+
+def run_analysis(cv_doc, cv_text: str, jd_text: str, cv_hash: Optional[str] = None,
+                 progress: Optional[Dict] = None, session_key: Optional[str] = None) -> Dict:
+    """
+    Everything behind "Analyse". `cv_doc` is the parsed CV PdfDocument, or
+    None for a plain-text CV (no ATS audit, preview is the text itself), and
+    `cv_hash` the content hash of the uploaded CV. The CV and JD profiles are
+    cached separately, so a JD edit only re-extracts the JD, diffed against
+    earlier JDs of the same `session_key` (default: this CV). `progress` is
+    updated in place with frac/stage for a progress bar.
+    """
+    progress = progress if progress is not None else {}
+    bank = get_bank()
+    progress.update(frac=0.1, stage="Reading CV")
+    # the upload was parsed in the fast tier; tables come from the deep check
+    cv = cached_cv_profile(cv_doc, cv_text, cv_hash, bank)
+    progress.update(frac=0.5, stage="Matching skills")
+    jd = cached_jd_profile(jd_text, bank, session_key or cv_hash or content_hash(cv_text))
+    results = compare_skill_sets(cv["skills"], jd["skills"], bank)
+    progress.update(frac=0.8, stage="Writing suggestions")
+    ats = cv["ats"]
+    suggestions = craft_suggestions(results, bank.skills_by_cat, ats or {}, skill_cat=bank.skill_cat)
+    narrative = recruiter_narrative(results)
+    sim = similarity(cv_text, jd_text)
+    matched = set(results["matched"])
+    highlights = [span for span in skill_spans(cv["preview"], bank) if span[2] in matched]
+    progress.update(frac=1.0, stage="Done")
+
+    return {
+        "results": results,
+        "similarity": sim,
+        "blended_score": blend(results["score"], sim),
+        "ats": ats,
+        "suggestions": suggestions,
+        "narrative": narrative,
+        "preview": cv["preview"],
+        # (start, end, skill) of matched skills in preview.lower(), for highlighting
+        "preview_highlights": highlights,
+        "report_md": build_report(results, ats, narrative, sim),
+    }
+
+
+def run_deep_check(data: bytes, name: str, analysis: Dict, progress: Optional[Dict] = None,
+                   isolated: bool = True) -> Dict:
+    """Re-audit the CV with table detection and refresh what depends on it."""
+    progress = progress if progress is not None else {}
+    progress.update(frac=0.1, stage="Detecting tables")
+    ats = cached_ats_audit(data, name, mode="deep", isolated=isolated)
+    progress.update(frac=0.9, stage="Writing suggestions")
+    results = analysis["results"]
+    bank = get_bank()
+    progress.update(frac=1.0, stage="Done")
+    return {
+        **analysis,
+        "ats": ats,
+        "suggestions": craft_suggestions(results, bank.skills_by_cat, ats, skill_cat=bank.skill_cat),
+        "report_md": build_report(results, ats, analysis["narrative"], analysis.get("similarity")),
+    }
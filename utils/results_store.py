@@ -0,0 +1,432 @@
+# utils/results_store.py
+"""
+Analysis results kept for reporting and aggregate queries.
+
+    python -m utils.batch jd.pdf applicants/ --store results.db --role "Data Engineer"
+    python -m utils.results_store results.db export --out all.parquet
+    python -m utils.results_store results.db skills --role "Data Engineer" --top 10
+
+One row per (role, candidate) analysis with its scores and ATS flags as a
+bitmask; matched / missing / extra skills are integer skill IDs in a
+WITHOUT ROWID table clustered by analysis, with a second index by skill
+for the aggregates, and category coverage is one small row per category.
+Skill IDs are the store's own, so rows written under different bank
+versions stay comparable. Exports page through the table (EXPORT_BATCH
+analyses at a time) and write CSV, Parquet or Markdown as they go, so
+the size of the store never matters.
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.skill_bank import get_bank
+
+EXPORT_BATCH = 500
+EXPORT_FORMATS = ("csv", "parquet", "md", "jsonl")
+# bit i of analyses.ats_flags; see ats_flag_names
+ATS_FLAGS = ("truncated", "read_error", "multi_column", "many_fonts", "tables", "images",
+             "long", "no_contact", "missing_sections")
+_STATUS = {"matched": 0, "missing": 1, "extra": 2}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roles (
+    id INTEGER PRIMARY KEY,
+    ref TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS skills (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    role INTEGER NOT NULL,
+    candidate TEXT NOT NULL,
+    bank_version TEXT NOT NULL,
+    created REAL NOT NULL,
+    score REAL NOT NULL,
+    similarity REAL,
+    blended REAL,
+    ats_flags INTEGER,
+    duplicate_of TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    UNIQUE (role, candidate)
+);
+CREATE INDEX IF NOT EXISTS analyses_role_score ON analyses(role, score DESC);
+CREATE TABLE IF NOT EXISTS analysis_skills (
+    analysis INTEGER NOT NULL,
+    status INTEGER NOT NULL,   -- 0 matched, 1 missing, 2 extra
+    skill INTEGER NOT NULL,
+    PRIMARY KEY (analysis, status, skill)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS analysis_skills_skill ON analysis_skills(status, skill);
+CREATE TABLE IF NOT EXISTS coverage (
+    analysis INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    matched INTEGER NOT NULL,
+    jd_total INTEGER NOT NULL,
+    PRIMARY KEY (analysis, category)
+) WITHOUT ROWID;
+"""
+
+
+def ats_flag_names(ats: Dict) -> List[str]:
+    """The ATS_FLAGS an ats_audit result raises (the conditions behind its warnings)."""
+    flags = {
+        "truncated": ats.get("truncated"),
+        "read_error": any(w.startswith("PDF read error") for w in ats.get("warnings", [])),
+        "multi_column": ats.get("multi_column"),
+        "many_fonts": ats.get("font_families", 0) > 4,
+        "tables": ats.get("tables"),
+        "images": ats.get("images", 0) > 0,
+        "long": ats.get("pages", 0) > 2,
+        "no_contact": not (ats.get("contacts", {}).get("email") and ats.get("contacts", {}).get("phone")),
+        "missing_sections": bool({"summary", "skills", "experience", "education"}
+                                 - set(ats.get("sections", {}).get("found", []))),
+    }
+    return [f for f in ATS_FLAGS if flags[f]]
+
+
+def _flag_mask(names: Iterable[str]) -> int:
+    return sum(1 << ATS_FLAGS.index(f) for f in names)
+
+
+def _mask_flags(mask: Optional[int]) -> Optional[List[str]]:
+    return None if mask is None else [f for i, f in enumerate(ATS_FLAGS) if mask >> i & 1]
+
+
+class ResultStore:
+    """SQLite store of analysis results, one row per (role, candidate)."""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.db = sqlite3.connect(path, timeout=timeout)
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self._skill_ids: Dict[str, int] = dict(self.db.execute("SELECT name, id FROM skills"))
+        self._role_ids: Dict[str, int] = dict(self.db.execute("SELECT ref, id FROM roles"))
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def commit(self):
+        self.db.commit()
+
+    def role_id(self, ref: str, title: str = "") -> int:
+        rid = self._role_ids.get(ref)
+        if rid is None:
+            # OR IGNORE + SELECT: another writer may have added it since we loaded
+            self.db.execute("INSERT OR IGNORE INTO roles (ref, title) VALUES (?, ?)", (ref, title))
+            rid = self.db.execute("SELECT id FROM roles WHERE ref = ?", (ref,)).fetchone()[0]
+            self._role_ids[ref] = rid
+        elif title:
+            self.db.execute("UPDATE roles SET title = ? WHERE id = ?", (title, rid))
+        return rid
+
+    def _skill_id(self, name: str) -> int:
+        sid = self._skill_ids.get(name)
+        if sid is None:
+            self.db.execute(
+                "INSERT OR IGNORE INTO skills (name, category) VALUES (?, ?)",
+                (name, get_bank().skill_cat.get(name, "")),
+            )
+            sid = self.db.execute("SELECT id FROM skills WHERE name = ?", (name,)).fetchone()[0]
+            self._skill_ids[name] = sid
+        return sid
+
+    def add(self, role: str, candidate: str, results: Dict, ats: Optional[Dict] = None,
+            similarity: Optional[float] = None, blended: Optional[float] = None,
+            duplicate_of: str = "", error: str = "", commit: bool = True,
+            bank_version: Optional[str] = None) -> int:
+        """
+        Insert or replace one analysis. `results` is an analyse_cv_vs_jd /
+        compare_skill_sets result (or a batch row: score, matched, missing,
+        category_breakdown); `ats` an ats_audit result, None when not audited.
+        """
+        rid = self.role_id(role)
+        old = self.db.execute(
+            "SELECT id FROM analyses WHERE role = ? AND candidate = ?", (rid, candidate)).fetchone()
+        if old is not None:
+            self.db.execute("DELETE FROM analysis_skills WHERE analysis = ?", old)
+            self.db.execute("DELETE FROM coverage WHERE analysis = ?", old)
+            self.db.execute("DELETE FROM analyses WHERE id = ?", old)
+        aid = self.db.execute(
+            "INSERT INTO analyses (role, candidate, bank_version, created, score, similarity, "
+            "blended, ats_flags, duplicate_of, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rid, candidate, bank_version or get_bank().version, time.time(),
+             results.get("score", 0.0), similarity, blended,
+             None if ats is None else _flag_mask(ats_flag_names(ats)), duplicate_of, error),
+        ).lastrowid
+        self.db.executemany(
+            "INSERT OR IGNORE INTO analysis_skills (analysis, status, skill) VALUES (?, ?, ?)",
+            [(aid, status, self._skill_id(s))
+             for key, status in _STATUS.items() for s in results.get(key, ())],
+        )
+        self.db.executemany(
+            "INSERT INTO coverage (analysis, category, matched, jd_total) VALUES (?, ?, ?, ?)",
+            [(aid, cat, d["matched"], d["jd_total"])
+             for cat, d in results.get("category_breakdown", {}).items()],
+        )
+        if commit:
+            self.db.commit()
+        return aid
+
+    def add_bundle(self, role: str, candidate: str, bundle: Dict, commit: bool = True) -> int:
+        """Store a utils.report.run_analysis bundle."""
+        return self.add(role, candidate, bundle["results"], bundle.get("ats"),
+                        bundle.get("similarity"), bundle.get("blended_score"), commit=commit)
+
+    def add_row(self, role: str, row: Dict, commit: bool = True) -> int:
+        """Store a utils.batch row."""
+        return self.add(role, row["name"], row, None, row.get("similarity"), row.get("blended"),
+                        row.get("duplicate_of", ""), row.get("error", ""), commit=commit)
+
+    # --------- reading ---------
+    def roles(self) -> List[str]:
+        return [r[0] for r in self.db.execute("SELECT ref FROM roles ORDER BY ref")]
+
+    def categories(self) -> List[str]:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT category FROM coverage ORDER BY category")]
+
+    def iter_rows(self, role: Optional[str] = None, batch: int = EXPORT_BATCH) -> Iterator[Dict]:
+        """
+        Every stored analysis as a dict, by role then score (best first), with
+        `rank` within its role. Reads `batch` analyses at a time.
+        """
+        names = {sid: name for name, sid in self._skill_ids.items()}
+        names.update((sid, name) for sid, name in self.db.execute("SELECT id, name FROM skills"))
+        sql = ("SELECT a.id, r.ref, a.candidate, a.score, a.similarity, a.blended, a.ats_flags, "
+               "a.duplicate_of, a.error FROM analyses a JOIN roles r ON r.id = a.role")
+        params: Tuple = ()
+        if role is not None:
+            sql += " WHERE r.ref = ?"
+            params = (role,)
+        cur = self.db.execute(sql + " ORDER BY r.ref, a.score DESC, a.candidate", params)
+        last_role, rank = None, 0
+        while True:
+            page = cur.fetchmany(batch)
+            if not page:
+                return
+            ids = [r[0] for r in page]
+            marks = ",".join("?" * len(ids))
+            skills: Dict[int, Dict[str, List[str]]] = {i: {k: [] for k in _STATUS} for i in ids}
+            keys = list(_STATUS)
+            for aid, status, sid in self.db.execute(
+                    f"SELECT analysis, status, skill FROM analysis_skills WHERE analysis IN ({marks})", ids):
+                skills[aid][keys[status]].append(names[sid])
+            cover: Dict[int, Dict[str, Dict[str, int]]] = {i: {} for i in ids}
+            for aid, cat, matched, total in self.db.execute(
+                    f"SELECT analysis, category, matched, jd_total FROM coverage WHERE analysis IN ({marks})",
+                    ids):
+                cover[aid][cat] = {"matched": matched, "jd_total": total}
+            for aid, ref, cand, score, sim, blended, flags, dup, err in page:
+                rank = rank + 1 if ref == last_role else 1
+                last_role = ref
+                yield {
+                    "role": ref, "rank": rank, "candidate": cand, "score": score,
+                    "similarity": sim, "blended": blended,
+                    **{k: sorted(v) for k, v in skills[aid].items()},
+                    "category_breakdown": cover[aid], "ats_flags": _mask_flags(flags),
+                    "duplicate_of": dup, "error": err,
+                }
+
+    # --------- aggregates ---------
+    def role_summary(self) -> List[Dict]:
+        """Per role: analyses, mean / max score, mean similarity, errors."""
+        cur = self.db.execute(
+            "SELECT r.ref, COUNT(*), ROUND(AVG(a.score), 2), MAX(a.score), "
+            "ROUND(AVG(a.similarity), 2), SUM(a.error != '') "
+            "FROM analyses a JOIN roles r ON r.id = a.role GROUP BY r.ref ORDER BY r.ref")
+        return [{"role": r, "analyses": n, "mean_score": mean, "max_score": best,
+                 "mean_similarity": sim, "errors": errs} for r, n, mean, best, sim, errs in cur]
+
+    def skill_frequency(self, status: str = "missing", role: Optional[str] = None,
+                        top: Optional[int] = 20) -> List[Dict]:
+        """
+        How often each skill is `status` (matched / missing / extra) per role,
+        most frequent first, as a count and a share of the role's analyses.
+        """
+        where, params = "s.status = ?", [_STATUS[status]]
+        if role is not None:
+            where += " AND r.ref = ?"
+            params.append(role)
+        cur = self.db.execute(f"""
+            WITH counts AS (
+                SELECT r.ref AS role, s.skill AS skill, COUNT(*) AS n
+                FROM analysis_skills s
+                JOIN analyses a ON a.id = s.analysis
+                JOIN roles r ON r.id = a.role
+                WHERE {where}
+                GROUP BY r.ref, s.skill
+            ), totals AS (
+                SELECT r.ref AS role, COUNT(*) AS total
+                FROM analyses a JOIN roles r ON r.id = a.role GROUP BY r.ref
+            ), ranked AS (
+                SELECT role, skill, n, ROW_NUMBER() OVER (PARTITION BY role ORDER BY n DESC, skill) AS k
+                FROM counts
+            )
+            SELECT ranked.role, sk.name, sk.category, ranked.n, ROUND(1.0 * ranked.n / totals.total, 4)
+            FROM ranked
+            JOIN totals ON totals.role = ranked.role
+            JOIN skills sk ON sk.id = ranked.skill
+            WHERE ? IS NULL OR ranked.k <= ?
+            ORDER BY ranked.role, ranked.k
+        """, params + [top, top])
+        return [{"role": r, "skill": s, "category": c, "count": n, "share": share}
+                for r, s, c, n, share in cur]
+
+    def missing_skill_frequency(self, role: Optional[str] = None, top: Optional[int] = 20) -> List[Dict]:
+        return self.skill_frequency("missing", role, top)
+
+    def ats_flag_frequency(self, role: Optional[str] = None) -> Dict[str, int]:
+        """How many audited analyses raise each ATS flag."""
+        sums = ", ".join(f"SUM((a.ats_flags >> {i}) & 1)" for i in range(len(ATS_FLAGS)))
+        sql = f"SELECT {sums} FROM analyses a JOIN roles r ON r.id = a.role WHERE a.ats_flags IS NOT NULL"
+        row = self.db.execute(sql + (" AND r.ref = ?" if role else ""), (role,) if role else ()).fetchone()
+        return {f: int(n or 0) for f, n in zip(ATS_FLAGS, row)}
+
+
+# --------- streaming export ---------
+def export_csv(rows: Iterable[Dict], out, categories: List[str]):
+    writer = csv.writer(out)
+    writer.writerow(["role", "rank", "candidate", "score", "similarity", "blended", "matched",
+                     "missing"] + categories + ["missing_skills", "ats_flags", "duplicate_of", "error"])
+    for row in rows:
+        bd = row["category_breakdown"]
+        writer.writerow(
+            [row["role"], row["rank"], row["candidate"], row["score"], row["similarity"],
+             row["blended"], len(row["matched"]), len(row["missing"])]
+            + [f"{bd[c]['matched']}/{bd[c]['jd_total']}" if c in bd else "" for c in categories]
+            + ["; ".join(row["missing"]), "; ".join(row["ats_flags"] or []),
+               row["duplicate_of"], row["error"]]
+        )
+
+
+def export_jsonl(rows: Iterable[Dict], out):
+    for row in rows:
+        out.write(json.dumps(row) + "\n")
+
+
+def export_markdown(rows: Iterable[Dict], out, max_skills: int = 8):
+    """One ranked table per role; skill lists are cut to `max_skills`."""
+    def cut(skills: List[str]) -> str:
+        extra = len(skills) - max_skills
+        return ", ".join(skills[:max_skills]) + (f" (+{extra})" if extra > 0 else "")
+
+    out.write("# CVSense Pro Results\n")
+    role = None
+    for row in rows:
+        if row["role"] != role:
+            role = row["role"]
+            out.write(f"\n## {role}\n\n"
+                      "| Rank | Candidate | Score | Similarity | Missing skills | ATS flags |\n"
+                      "|---:|---|---:|---:|---|---|\n")
+        cells = [str(row["rank"]), row["candidate"], f"{row['score']}%",
+                 "" if row["similarity"] is None else f"{row['similarity']}%",
+                 cut(row["missing"]),
+                 "n/a" if row["ats_flags"] is None else ", ".join(row["ats_flags"]) or "none"]
+        if row["error"]:
+            cells[4] = f"error: {row['error']}"
+        out.write("| " + " | ".join(c.replace("|", "\\|") for c in cells) + " |\n")
+
+
+def export_parquet(rows: Iterable[Dict], path: str, batch: int = EXPORT_BATCH):
+    """Write rows to Parquet one row group of `batch` rows at a time (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    strings = pa.list_(pa.string())
+    schema = pa.schema([
+        ("role", pa.string()), ("rank", pa.int32()), ("candidate", pa.string()),
+        ("score", pa.float64()), ("similarity", pa.float64()), ("blended", pa.float64()),
+        ("matched", strings), ("missing", strings), ("extra", strings),
+        ("category_breakdown", pa.list_(pa.struct([
+            ("category", pa.string()), ("matched", pa.int32()), ("jd_total", pa.int32())]))),
+        ("ats_flags", strings), ("duplicate_of", pa.string()), ("error", pa.string()),
+    ])
+
+    def flat(row: Dict) -> Dict:
+        return {**row, "category_breakdown": [
+            {"category": c, **d} for c, d in sorted(row["category_breakdown"].items())]}
+
+    with pq.ParquetWriter(path, schema) as writer:
+        chunk: List[Dict] = []
+        for row in rows:
+            chunk.append(flat(row))
+            if len(chunk) >= batch:
+                writer.write_table(pa.Table.from_pylist(chunk, schema))
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema))
+
+
+def export(store: ResultStore, path: str, fmt: Optional[str] = None, role: Optional[str] = None):
+    """Stream the store (or one role) to `path` ('-' = stdout); the format defaults to the extension."""
+    fmt = fmt or path.rsplit(".", 1)[-1].lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and path == "-":
+        raise ValueError("Parquet cannot be written to stdout; give a file path")
+    rows = store.iter_rows(role)
+    if fmt == "parquet":
+        export_parquet(rows, path)
+        return
+    out = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            export_csv(rows, out, store.categories())
+        elif fmt == "md":
+            export_markdown(rows, out)
+        else:
+            export_jsonl(rows, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Export and query stored analysis results.")
+    ap.add_argument("db", help="SQLite results store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="write every stored analysis as CSV, Parquet, Markdown or JSONL")
+    ex.add_argument("--out", default="-", help="output file; format from the extension (default: JSONL to stdout)")
+    ex.add_argument("--format", choices=EXPORT_FORMATS)
+    ex.add_argument("--role")
+    sk = sub.add_parser("skills", help="skill frequency per role")
+    sk.add_argument("--status", choices=tuple(_STATUS), default="missing")
+    sk.add_argument("--role")
+    sk.add_argument("--top", type=int, default=20, help="per role (0 = all)")
+    sub.add_parser("roles", help="per-role summary")
+    fl = sub.add_parser("ats", help="ATS flag counts")
+    fl.add_argument("--role")
+    args = ap.parse_args(argv)
+
+    store = ResultStore(args.db)
+    try:
+        if args.cmd == "export":
+            try:
+                export(store, args.out, args.format or ("jsonl" if args.out == "-" else None), args.role)
+            except ValueError as e:
+                ap.error(str(e))
+        elif args.cmd == "skills":
+            for row in store.skill_frequency(args.status, args.role, args.top or None):
+                print(json.dumps(row))
+        elif args.cmd == "roles":
+            for row in store.role_summary():
+                print(json.dumps(row))
+        else:
+            print(json.dumps(store.ats_flag_frequency(args.role)))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# utils/similarity.py
+"""
+Text similarity between CVs and JDs, as a signal next to the skills-bank score.
+
+Documents are normalised like extract_skills (URLs, emails, phones and
+years scrubbed), stripped of English stop words and hashed into word
+unigram + bigram counts, so there is no vocabulary to fit, ship or
+download. Counts get sublinear TF, an optional IDF, and L2 normalisation;
+the cosine of one JD against a stack of CVs is then a single sparse
+product. Vectorise CVs once (vectorize is stateless and safe to run in
+worker processes) and score them against any number of JDs:
+
+    cvs = vectorize(cv_texts)
+    sims = similarity_scores(vectorize([jd_text]), cvs)[0]   # 0..100 per CV
+"""
+import functools
+import os
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from utils.skill_extractor import _normalise_text
+
+N_FEATURES = int(os.environ.get("CVSENSE_SIM_FEATURES", 2 ** 20))
+BLEND_WEIGHT = float(os.environ.get("CVSENSE_SIM_WEIGHT", 0.25))
+
+
+@functools.lru_cache(maxsize=1)
+def _vectorizer() -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=N_FEATURES, preprocessor=_normalise_text, token_pattern=r"\S+",
+        ngram_range=(1, 2), stop_words="english", alternate_sign=False, norm=None,
+    )
+
+
+def _counts(texts: Iterable[str]) -> sparse.csr_matrix:
+    x = _vectorizer().transform(texts)
+    x.data = np.log1p(x.data)   # sublinear TF: repetition counts, but less
+    return x
+
+
+def fit_idf(texts: Iterable[str]) -> np.ndarray:
+    """Smoothed IDF weights over a reference corpus (e.g. the whole applicant pool)."""
+    x = _counts(texts)
+    df = np.bincount(x.indices, minlength=N_FEATURES)
+    return np.log((1.0 + x.shape[0]) / (1.0 + df)) + 1.0
+
+
+def vectorize(texts: Iterable[str], idf: Optional[np.ndarray] = None) -> sparse.csr_matrix:
+    """(docs x N_FEATURES) L2-normalised rows; pass `idf` from fit_idf to weight rare terms up."""
+    x = _counts(texts)
+    if idf is not None:
+        x = x @ sparse.diags(idf)
+    return normalize(x, copy=False)
+
+
+def similarity_scores(jds: sparse.csr_matrix, cvs: sparse.csr_matrix) -> np.ndarray:
+    """(JDs x CVs) cosine similarity in percent, from vectorize() rows."""
+    return 100.0 * (jds @ cvs.T).toarray()
+
+
+def similarity(cv_text: str, jd_text: str, idf: Optional[np.ndarray] = None) -> float:
+    x = vectorize([jd_text, cv_text], idf)
+    return round(float(similarity_scores(x[0], x[1])[0, 0]), 2)
+
+
+def blend(skill_score: float, sim: Union[float, np.ndarray],
+          weight: float = BLEND_WEIGHT) -> Union[float, np.ndarray]:
+    """Weighted mix of the skill score and the text similarity (both 0..100)."""
+    out = np.round((1.0 - weight) * skill_score + weight * np.asarray(sim), 2)
+    return float(out) if out.ndim == 0 else out
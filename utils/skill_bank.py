@@ -0,0 +1,236 @@
+# utils/skill_bank.py
+"""
+Compiled, versioned skills bank.
+
+    python -m utils.skill_bank build      # data/skills_bank.json -> data/skills_bank.pkl
+
+A SkillBank holds everything derived from data/skills_bank.json plus the
+category weights: canonical sets, synonyms, interned skill IDs, weight and
+category arrays and the phrase automaton. The build step pickles it so a
+process loads it with one unpickle instead of re-deriving it. get_bank()
+also watches the JSON/artifact and hot-swaps to a new version without a
+restart; callers grab the bank once per analysis, so in-flight work
+finishes on the version it started with.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from utils.phrase_matcher import PhraseMatcher
+
+log = logging.getLogger("cvsense.skill_bank")
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(__file__))
+BANK_PATH = os.path.join(_REPO_ROOT, "data", "skills_bank.json")
+ARTIFACT_PATH = os.path.join(_REPO_ROOT, "data", "skills_bank.pkl")
+
+# How often get_bank() looks for a changed bank on disk (0 disables hot reload)
+RELOAD_INTERVAL_S = float(os.environ.get("CVSENSE_BANK_RELOAD_SECS", 5))
+
+# Category weights (tune freely)
+DEFAULT_CAT_WEIGHTS: Dict[str, float] = {
+    "programming_languages": 1.5,
+    "data_frame_and_compute": 1.2,
+    "ml_core": 1.8,
+    "time_series": 1.6,
+    "recommenders": 1.4,
+    "deep_learning": 1.8,
+    "nlp": 1.6,
+    "computer_vision": 1.6,
+    "genai_llms": 1.8,
+    "mlops": 2.0,
+    "data_engineering_core": 2.0,
+    "cloud_azure": 2.0,
+    "cloud_aws": 1.5,
+    "cloud_gcp": 1.5,
+    "databases_warehousing_bi": 1.4,
+    "data_quality_governance": 1.3,
+    "testing_ci_cd_devops": 1.3,
+    "metrics_eval": 1.2,
+    "security_governance_ops": 1.1,
+    "tools_editors": 1.0,
+}
+
+
+def bank_version(raw: bytes, cat_weights: Dict[str, float]) -> str:
+    """Content version of the bank + weights; cache keys must include it."""
+    return hashlib.sha256(
+        raw + json.dumps(cat_weights, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:12]
+
+
+class SkillBank:
+    """Everything extraction and scoring derive from one version of the bank."""
+
+    def __init__(self, raw: bytes, cat_weights: Optional[Dict[str, float]] = None):
+        bank = json.loads(raw.decode("utf-8"))
+        self.cat_weights: Dict[str, float] = dict(cat_weights or DEFAULT_CAT_WEIGHTS)
+        self.version = bank_version(raw, self.cat_weights)
+
+        self.skills_by_cat: Dict[str, Set[str]] = {
+            cat: {s.lower() for s in skills} for cat, skills in bank["skills"].items()
+        }
+        self.all_skills: Set[str] = set().union(*self.skills_by_cat.values())
+        self.synonyms: Dict[str, str] = {
+            k.lower(): v.lower() for k, v in bank.get("synonyms", {}).items()
+        }
+
+        # Interned skill IDs: every canonical skill (bank entries and synonym
+        # targets) gets a dense integer ID. Skill sets become boolean vectors
+        # over those IDs, and weights / category membership become arrays.
+        self.skill_list: List[str] = sorted(self.all_skills | set(self.synonyms.values()))
+        self.skill_id: Dict[str, int] = {s: i for i, s in enumerate(self.skill_list)}
+        self.categories: List[str] = list(self.skills_by_cat)
+        self.skill_cat: Dict[str, str] = {}   # first category a skill appears in
+        for cat, skills in self.skills_by_cat.items():
+            for s in skills:
+                self.skill_cat.setdefault(s, cat)
+        self.weight_arr = np.array(
+            [self.cat_weights.get(self.skill_cat.get(s), 1.0) for s in self.skill_list]
+        )
+        self.cat_matrix = np.array(
+            [[s in self.skills_by_cat[cat] for s in self.skill_list] for cat in self.categories],
+            dtype=np.int32,
+        )
+        self._matcher: Optional[PhraseMatcher] = None
+
+    @property
+    def matcher(self) -> PhraseMatcher:
+        """Exact-phrase automaton over every skill and synonym key, compiled on first use."""
+        if self._matcher is None:
+            self._matcher = PhraseMatcher(
+                ph.lower().strip() for ph in list(self.all_skills) + list(self.synonyms)
+            )
+        return self._matcher
+
+    def canon(self, term: str) -> str:
+        t = term.strip().lower()
+        return self.synonyms.get(t, t)
+
+    def weight(self, skill: str) -> float:
+        return self.cat_weights.get(self.skill_cat.get(skill), 1.0)
+
+
+# --------- artifact ---------
+def build_artifact(src: str = BANK_PATH, out: str = ARTIFACT_PATH,
+                   cat_weights: Optional[Dict[str, float]] = None) -> SkillBank:
+    """Compile the bank (matcher included) and write it atomically to `out`."""
+    with open(src, "rb") as f:
+        bank = SkillBank(f.read(), cat_weights)
+    bank.matcher  # compile before pickling
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(bank, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out)
+    return bank
+
+
+def load_bank(src: Optional[str] = None, artifact: Optional[str] = None,
+              cat_weights: Optional[Dict[str, float]] = None) -> SkillBank:
+    """
+    Load the current bank: the prebuilt artifact when it matches the JSON's
+    content version, otherwise compile from the JSON. The version is checked
+    against `cat_weights` when given, else against the weights the artifact
+    was built with, so `build_artifact(cat_weights=...)` output is used too.
+    """
+    src, artifact = src or BANK_PATH, artifact or ARTIFACT_PATH
+    with open(src, "rb") as f:
+        raw = f.read()
+    weights = cat_weights
+    if os.path.exists(artifact):
+        try:
+            with open(artifact, "rb") as f:
+                bank = pickle.load(f)
+        except Exception as e:
+            log.warning("skills bank artifact %s unreadable (%s); compiling %s", artifact, e, src)
+        else:
+            if isinstance(bank, SkillBank):
+                weights = cat_weights or bank.cat_weights
+                if bank.version == bank_version(raw, weights):
+                    return bank
+            log.warning("skills bank artifact %s does not match %s; compiling from JSON", artifact, src)
+    return SkillBank(raw, weights)
+
+
+# --------- current bank + hot reload ---------
+_lock = threading.Lock()
+_current: Optional[SkillBank] = None
+_stamp: tuple = ()
+_checked_at = 0.0
+
+
+def _disk_stamp() -> tuple:
+    out = []
+    for p in (BANK_PATH, ARTIFACT_PATH):
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def get_bank(reload: bool = True) -> SkillBank:
+    """
+    The bank analyses should use. Grab it once per analysis and pass it along;
+    a reload swaps the module reference, never mutates a bank in place.
+    reload=False skips the check for a changed bank on disk (which may
+    recompile it), for callers that must not block, e.g. an event loop.
+    """
+    if _current is None or (reload and RELOAD_INTERVAL_S
+                            and time.monotonic() - _checked_at >= RELOAD_INTERVAL_S):
+        reload_bank()
+    return _current
+
+
+def reload_bank(force: bool = False) -> SkillBank:
+    """Swap to the on-disk bank if the JSON or artifact changed since the last load."""
+    global _current, _stamp, _checked_at
+    with _lock:
+        _checked_at = time.monotonic()
+        stamp = _disk_stamp()
+        if force or _current is None or stamp != _stamp:
+            try:
+                bank = load_bank()
+            except Exception:
+                # e.g. the JSON caught mid-edit: keep serving the old version
+                if _current is None:
+                    raise
+                return _current
+            if _current is None or bank.version != _current.version:
+                _current = bank
+            _stamp = stamp
+        return _current
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Compile the skills bank into a loadable artifact.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--src", default=BANK_PATH)
+    b.add_argument("--out", default=ARTIFACT_PATH)
+    sub.add_parser("version")
+    args = ap.parse_args(argv)
+    if args.cmd == "build":
+        bank = build_artifact(args.src, args.out)
+        print(f"built {args.out}: version {bank.version}, {len(bank.skill_list)} skills, "
+              f"{len(bank.matcher.phrases)} phrases")
+    else:
+        print(get_bank().version)
+    return 0
+
+
+if __name__ == "__main__":
+    # Run the imported module's main so the artifact pickles
+    # utils.skill_bank.SkillBank, not __main__.SkillBank.
+    from utils.skill_bank import main as _main
+    sys.exit(_main())
@@ -1,164 +1,371 @@
-import json
-import os
+import bisect
 import re
-from typing import Dict, List, Set, Tuple
-from rapidfuzz import fuzz
-import spacy
-import streamlit as st
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from rapidfuzz import fuzz, process
+from utils import telemetry
+from utils.skill_bank import SkillBank, get_bank
 
-@st.cache_resource
-def load_spacy():
-    return spacy.load("en_core_web_sm")
-
-_nlp = load_spacy()
- # load once globally
+# Kept free of UI imports and model loading so workers, CLIs and tests import
+# this module cheaply. The skill matcher is compiled on first use.
 
+# --------- skills bank ---------
+# All bank-derived state (sets, synonyms, interned IDs, weight/category arrays,
+# matcher) lives on a versioned SkillBank from utils.skill_bank. Public entry
+# points take it once per call and pass it down, so a hot reload never mixes
+# two versions inside one analysis.
+_BANK_ATTRS = {
+    "_SKILLS_BY_CAT": "skills_by_cat",
+    "_ALL_SKILLS": "all_skills",
+    "_SYNONYMS": "synonyms",
+    "_CAT_WEIGHTS": "cat_weights",
+    "BANK_VERSION": "version",
+    "_SKILL_LIST": "skill_list",
+    "_SKILL_ID": "skill_id",
+    "_CATEGORIES": "categories",
+    "_SKILL_CAT": "skill_cat",
+    "_WEIGHT_ARR": "weight_arr",
+    "_CAT_MATRIX": "cat_matrix",
+}
 
-# --------- load skills bank ---------
-_REPO_ROOT = os.path.dirname(os.path.dirname(__file__))
-_BANK_PATH = os.path.join(_REPO_ROOT, "data", "skills_bank.json")
+def __getattr__(name: str):
+    # Module-level names kept for existing importers; always the current bank.
+    if name in _BANK_ATTRS:
+        return getattr(get_bank(), _BANK_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-with open(_BANK_PATH, "r", encoding="utf-8") as f:
-    _BANK = json.load(f)
+def skill_vector(skills: Iterable[str], bank: Optional[SkillBank] = None) -> np.ndarray:
+    """Boolean vector over interned skill IDs; skills outside the bank are dropped."""
+    bank = bank or get_bank()
+    vec = np.zeros(len(bank.skill_list), dtype=bool)
+    vec[[bank.skill_id[s] for s in skills if s in bank.skill_id]] = True
+    return vec
 
-_SKILLS_BY_CAT: Dict[str, Set[str]] = {
-    cat: {s.lower() for s in skills} for cat, skills in _BANK["skills"].items()
-}
-_ALL_SKILLS: Set[str] = set().union(*_SKILLS_BY_CAT.values())
-_SYNONYMS: Dict[str, str] = {k.lower(): v.lower() for k, v in _BANK.get("synonyms", {}).items()}
-
-# Category weights (tune freely)
-_CAT_WEIGHTS: Dict[str, float] = {
-    "programming_languages": 1.5,
-    "data_frame_and_compute": 1.2,
-    "ml_core": 1.8,
-    "time_series": 1.6,
-    "recommenders": 1.4,
-    "deep_learning": 1.8,
-    "nlp": 1.6,
-    "computer_vision": 1.6,
-    "genai_llms": 1.8,
-    "mlops": 2.0,
-    "data_engineering_core": 2.0,
-    "cloud_azure": 2.0,
-    "cloud_aws": 1.5,
-    "cloud_gcp": 1.5,
-    "databases_warehousing_bi": 1.4,
-    "data_quality_governance": 1.3,
-    "testing_ci_cd_devops": 1.3,
-    "metrics_eval": 1.2,
-    "security_governance_ops": 1.1,
-    "tools_editors": 1.0,
-}
+def vector_skills(vec: np.ndarray, bank: Optional[SkillBank] = None) -> List[str]:
+    """Sorted skill names set in a skill vector."""
+    bank = bank or get_bank()
+    return [bank.skill_list[i] for i in np.flatnonzero(vec)]
 
 # --------- helpers ---------
-_WORD_BOUNDARY = r"(?<![A-Za-z0-9]){phrase}(?![A-Za-z0-9])"
+# One scrub pass blanks URLs, emails, phones and years (in that priority) with
+# spaces of the same length, so offsets still index text.lower(); one scan
+# then reads the tokens. Everything outside the token class separates tokens.
+_SCRUB_RE = re.compile(
+    r"https?://\S+|www\.\S+"
+    r"|\b[\w\.-]+@[\w\.-]+\.\w+\b"
+    r"|\+?\d[\d\-\s()]{6,}\d"      # phones
+    r"|\b(?:19|20)\d{2}\b"            # years
+)
+_TOKEN_RE = re.compile(r"[a-z0-9\-\+\./]+")
 
-def _normalise_text(t: str) -> str:
+def _blank(m: "re.Match") -> str:
+    return " " * (m.end() - m.start())
+
+def _tokens(t: str) -> List[str]:
+    """The normalised token stream of `t` (what _normalise_text joins)."""
     if not t:
-        return ""
-    t = t.lower()
-    t = re.sub(r"https?://\S+|www\.\S+", " ", t)
-    t = re.sub(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", " ", t)
-    t = re.sub(r"\+?\d[\d\-\s()]{6,}\d", " ", t)   # phones
-    t = re.sub(r"\b(19|20)\d{2}\b", " ", t)        # years
-    t = re.sub(r"[^a-z0-9\-\+\./ ]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
-def _canon(term: str) -> str:
-    t = term.strip().lower()
-    return _SYNONYMS.get(t, t)
-
-# Pre-compile regex patterns for exact phrase hits (skills + synonym keys)
-_PATTERNS: List[Tuple[str, re.Pattern]] = []
-_seen_for_patterns: Set[str] = set()
-
-def _add_pattern(phrase: str):
-    ph = phrase.lower().strip()
-    if ph and ph not in _seen_for_patterns:
-        patt = re.compile(_WORD_BOUNDARY.format(phrase=re.escape(ph)))
-        _PATTERNS.append((ph, patt))
-        _seen_for_patterns.add(ph)
-
-for ph in _ALL_SKILLS:
-    _add_pattern(ph)
-for syn_key in _SYNONYMS.keys():
-    _add_pattern(syn_key)
+        return []
+    return _TOKEN_RE.findall(_SCRUB_RE.sub(" ", t.lower()))
+
+def _token_offsets(t: str) -> Tuple[List[str], List[int]]:
+    """
+    Tokens of `t` with their start offsets in t.lower() (the same as offsets
+    in `t` unless it holds one of the rare characters whose lowercase form
+    is longer). Blanking scrubbed spans to equal length keeps offsets intact.
+    """
+    if not t:
+        return [], []
+    t = _SCRUB_RE.sub(_blank, t.lower())
+    tokens, starts = [], []
+    for m in _TOKEN_RE.finditer(t):
+        tokens.append(m.group())
+        starts.append(m.start())
+    return tokens, starts
+
+def _normalise_text(t: str) -> str:
+    return " ".join(_tokens(t))
+
+def _canon(term: str, bank: Optional[SkillBank] = None) -> str:
+    return (bank or get_bank()).canon(term)
 
 # --------- core extraction ---------
-def _exact_phrase_hits(text_norm: str) -> Set[str]:
-    hits: Set[str] = set()
-    for ph, patt in _PATTERNS:
-        if patt.search(text_norm):
-            hits.add(_canon(ph))
-    return hits
-
-def _fuzzy_boost(text_norm: str, missing: Set[str], threshold: int = 92) -> Set[str]:
+def _exact_phrase_hits(text_norm: str, bank: Optional[SkillBank] = None) -> Set[str]:
+    bank = bank or get_bank()
+    telemetry.count("exact_chars_scanned", len(text_norm))
+    telemetry.count("exact_patterns_tested", len(bank.matcher.phrases))
+    return {bank.canon(ph) for ph in bank.matcher.search(text_norm)}
+
+# rapidfuzz worker threads for the batched fuzzy stage (-1 = all cores);
+# blocks smaller than _FUZZY_PARALLEL_MIN pairs are not worth the thread spin-up
+_FUZZY_WORKERS = -1
+_FUZZY_PARALLEL_MIN = 50_000
+
+def _length_window(n: int, threshold: int) -> Tuple[int, int]:
+    """
+    Token-set strings of lengths n and m with no token in common can only
+    reach `threshold` if 200 * min(n, m) / (n + m) >= threshold, because the
+    indel distance is at least |n - m|.
+    """
+    lo = (n * threshold) // (200 - threshold)
+    hi = -(-n * (200 - threshold) // threshold)
+    return lo, hi
+
+def _fuzzy_boost(text_norm: str, missing: Set[str], threshold: int = 92,
+                 tokens: Optional[List[str]] = None) -> Set[str]:
     """Very light fuzzy: try to rescue near-misses (e.g., 'ml flow' -> 'mlflow')."""
     if not missing:
         return set()
-    # Build simple n-grams up to trigrams from text_norm
-    tokens = [t for t in text_norm.split() if t]
-    grams: Set[str] = set()
-    for n in (1, 2, 3):
-        for i in range(len(tokens) - n + 1):
-            grams.add(" ".join(tokens[i:i+n]))
-    rescued = set()
-    for skill in list(missing):
-        for g in grams:
-            if fuzz.token_set_ratio(skill, g) >= threshold:
-                rescued.add(skill)
+    # n-grams up to trigrams are windows (start, n) over the token array;
+    # token_set_ratio only sees each side's set of tokens, so distinct grams
+    # are sets of token IDs, and strings are built only for cdist candidates.
+    tokens = text_norm.split() if tokens is None else tokens
+    if not tokens:
+        return set()
+    vocab = sorted(set(tokens))
+    tid = {tok: i for i, tok in enumerate(vocab)}   # ID order == string order
+    seq = [tid[tok] for tok in tokens]
+    positions: Dict[int, List[int]] = {}
+    for i, x in enumerate(seq):
+        positions.setdefault(x, []).append(i)
+
+    last = len(seq)
+    windows: Dict[int, Set[Tuple[int, ...]]] = {}
+
+    def windows_of(x: int) -> Set[Tuple[int, ...]]:
+        # distinct grams containing token x, as sorted ID tuples
+        if x not in windows:
+            out = set()
+            for p in positions[x]:
+                for n in (1, 2, 3):
+                    for i in range(max(0, p - n + 1), min(p, last - n) + 1):
+                        out.add(tuple(sorted(set(seq[i:i + n]))))
+            windows[x] = out
+        return windows[x]
+
+    rescued: Set[str] = set()
+    pending: Dict[int, List[str]] = {}
+    compared = 0
+    for skill in missing:
+        toks = frozenset(skill.split())
+        if not toks:
+            continue
+        # 1) grams sharing a token: subsets score 100 outright, the rest are
+        #    scored individually (there are only a handful per skill)
+        ids = {tid[tok] for tok in toks if tok in tid}
+        shared: Set[Tuple[int, ...]] = set()
+        for x in ids:
+            shared |= windows_of(x)
+        whole = len(ids) == len(toks)   # every skill token occurs in the text
+        if any(ids.issuperset(g) or (whole and ids.issubset(g)) for g in shared):
+            rescued.add(skill)
+            continue
+        hit = False
+        for g in shared:
+            compared += 1
+            if fuzz.token_set_ratio(skill, " ".join(map(vocab.__getitem__, g)),
+                                    score_cutoff=threshold) >= threshold:
+                hit = True
                 break
+        if hit:
+            rescued.add(skill)
+            continue
+        # 2) disjoint grams: only those in the length window can reach threshold
+        pending.setdefault(len(" ".join(sorted(toks))), []).append(skill)
+
+    # distinct grams as sorted ID tuples, bucketed by the length of their key
+    grams: Set[Tuple[int, ...]] = {(x,) for x in positions}
+    grams.update((a, b) if a < b else (b, a) for a, b in zip(seq, seq[1:]) if a != b)
+    grams.update(tuple(sorted({a, b, c})) for a, b, c in zip(seq, seq[1:], seq[2:]))
+    telemetry.count("fuzzy_ngrams", len(grams))
+    if not pending:
+        telemetry.count("fuzzy_comparisons", compared)
+        return rescued
+    vlen = [len(tok) for tok in vocab].__getitem__
+    gram_by_len: Dict[int, List[Tuple[int, ...]]] = {}
+    for g in grams:
+        gram_by_len.setdefault(sum(map(vlen, g)) + len(g) - 1, []).append(g)
+    keys: Dict[int, List[str]] = {}
+    word = vocab.__getitem__
+
+    def keys_of(m: int) -> List[str]:
+        if m not in keys:
+            keys[m] = [" ".join(map(word, g)) for g in gram_by_len.get(m, ())]
+        return keys[m]
+
+    for n, skills in pending.items():
+        lo, hi = _length_window(n, threshold)
+        cands = [key for m in range(lo, hi + 1) for key in keys_of(m)]
+        if not cands:
+            continue
+        compared += len(skills) * len(cands)
+        scores = process.cdist(
+            skills, cands, scorer=fuzz.token_set_ratio,
+            score_cutoff=threshold,
+            workers=_FUZZY_WORKERS if len(skills) * len(cands) >= _FUZZY_PARALLEL_MIN else 1,
+        )
+        for skill, row in zip(skills, scores):
+            if (row >= threshold).any():
+                rescued.add(skill)
+    telemetry.count("fuzzy_comparisons", compared)
     return rescued
 
-def extract_skills(text: str) -> Set[str]:
+@telemetry.timed("extract_skills")
+def extract_skills(text: str, bank: Optional[SkillBank] = None) -> Set[str]:
     """
     Returns canonical set of skills found in the text
     (synonyms mapped to canonical terms).
     """
-    t = _normalise_text(text)
+    bank = bank or get_bank()
+    with telemetry.stage("normalise"):
+        tokens = _tokens(text)
+    return _skills_of_tokens(tokens, bank)
+
+def _skills_of_tokens(tokens: List[str], bank: SkillBank) -> Set[str]:
+    t = " ".join(tokens)
     if not t:
         return set()
-    exact = _exact_phrase_hits(t)
+    with telemetry.stage("exact_hits"):
+        exact = _exact_phrase_hits(t, bank)
     # Try to rescue common near-misses
-    still_missing = (_ALL_SKILLS - exact)
-    rescued = _fuzzy_boost(t, still_missing, threshold=92)
+    still_missing = (bank.all_skills - exact)
+    with telemetry.stage("fuzzy_boost"):
+        rescued = _fuzzy_boost(t, still_missing, threshold=92, tokens=tokens)
     return exact.union(rescued)
 
-def analyse_cv_vs_jd(cv_text: str, jd_text: str) -> Dict:
-    cv = extract_skills(cv_text)
-    jd = extract_skills(jd_text)
+# --------- incremental extraction ---------
+# Re-extracting an edited text: fuzzy rescue of a skill only asks whether some
+# n-gram (up to a trigram) of the text scores over the threshold, so grams
+# untouched by the edit give the same answers as before. Only the edited
+# tokens, plus two on each side, need the full fuzzy scan. Exact hits are a
+# cheap whole-text scan, and earlier skills that lost their exact hit are
+# re-checked alone. The result is identical to extract_skills.
+_FUZZY_CONTEXT = 2
+
+def _edit_window(old: List[str], new: List[str]) -> Tuple[int, int]:
+    """[start, end) of `new` that differs from `old` (common prefix/suffix stripped)."""
+    n = min(len(old), len(new))
+    p = 0
+    while p < n and old[p] == new[p]:
+        p += 1
+    s = 0
+    while s < n - p and old[-1 - s] == new[-1 - s]:
+        s += 1
+    return p, len(new) - s
+
+def extract_skills_incremental(
+    text: str, previous: Iterable[Tuple[List[str], Set[str]]] = (),
+    bank: Optional[SkillBank] = None,
+) -> Tuple[Set[str], List[str]]:
+    """
+    extract_skills(text) and the token stream it was computed from.
+    `previous` holds (tokens, skills) of earlier versions extracted with the
+    same bank; the closest one is used as the base when the edit touches
+    less than half of the text, otherwise the text is extracted from scratch.
+    """
+    bank = bank or get_bank()
+    with telemetry.stage("normalise"):
+        tokens = _tokens(text)
+    base, window = None, None
+    for old_tokens, old_skills in previous:
+        w = _edit_window(old_tokens, tokens)
+        if window is None or w[1] - w[0] < window[1] - window[0]:
+            base, window = (old_tokens, old_skills), w
+    if base is None or (window[1] - window[0]) * 2 > len(tokens):
+        return _skills_of_tokens(tokens, bank), tokens
+    if window[0] == window[1] and len(base[0]) == len(tokens):
+        return set(base[1]), tokens                    # same token stream
+    telemetry.count("fuzzy_window_tokens", window[1] - window[0])
+    t = " ".join(tokens)
+    with telemetry.stage("exact_hits"):
+        exact = _exact_phrase_hits(t, bank)
+    missing = bank.all_skills - exact
+    lo, hi = max(0, window[0] - _FUZZY_CONTEXT), window[1] + _FUZZY_CONTEXT
+    with telemetry.stage("fuzzy_boost"):
+        edited = tokens[lo:hi]
+        rescued = _fuzzy_boost(" ".join(edited), missing, threshold=92, tokens=edited)
+        recheck = (base[1] & missing) - rescued
+        if recheck:
+            rescued |= _fuzzy_boost(t, recheck, threshold=92, tokens=tokens)
+    return exact | rescued, tokens
 
+def skill_spans(text: str, bank: Optional[SkillBank] = None) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, canonical skill) for every exact skill phrase in `text`, as
+    offsets into text.lower() (see _token_offsets), for highlighting. Fuzzy
+    rescues have no single span and are not included.
+    """
+    bank = bank or get_bank()
+    tokens, starts = _token_offsets(text)
+    # offset of each token in the joined normalised text
+    norm_starts, pos = [], 0
+    for tok in tokens:
+        norm_starts.append(pos)
+        pos += len(tok) + 1
+    spans = []
+    for s, e, phrase in bank.matcher.finditer(" ".join(tokens)):
+        first = bisect.bisect_right(norm_starts, s) - 1
+        lastk = bisect.bisect_right(norm_starts, e - 1) - 1
+        spans.append((
+            starts[first] + (s - norm_starts[first]),
+            starts[lastk] + (e - norm_starts[lastk]),
+            bank.canon(phrase),
+        ))
+    return spans
+
+def skill_weight(skill: str, bank: Optional[SkillBank] = None) -> float:
+    """Importance of a canonical skill: the weight of its (first) category."""
+    return (bank or get_bank()).weight(skill)
+
+@telemetry.timed("analyse")
+def analyse_cv_vs_jd(cv_text: str, jd_text: str, bank: Optional[SkillBank] = None) -> Dict:
+    bank = bank or get_bank()
+    return compare_skill_sets(extract_skills(cv_text, bank), extract_skills(jd_text, bank), bank)
+
+def compare_skill_sets(cv: Set[str], jd: Set[str], bank: Optional[SkillBank] = None) -> Dict:
+    """Score already-extracted CV skills against JD skills (see analyse_cv_vs_jd)."""
+    bank = bank or get_bank()
+    return compare_skill_vectors(
+        skill_vector(cv, bank), skill_vector(jd, bank),
+        cv_other={s for s in cv if s not in bank.skill_id},
+        jd_other={s for s in jd if s not in bank.skill_id},
+        bank=bank,
+    )
+
+def compare_skill_vectors(cv: np.ndarray, jd: np.ndarray,
+                          cv_other: Set[str] = frozenset(), jd_other: Set[str] = frozenset(),
+                          bank: Optional[SkillBank] = None) -> Dict:
+    """
+    Vectorised core of analyse_cv_vs_jd over skill vectors. `cv_other` and
+    `jd_other` carry any skills that are not in the bank (weight 1.0, no category).
+    """
+    bank = bank or get_bank()
     matched = jd & cv
-    missing = jd - cv
-    extra   = cv - jd
+    missing = jd & ~cv
+    extra   = cv & ~jd
+    matched_o = jd_other & cv_other
 
     # weighted score by JD skill importance per category
-    def weight(skill: str) -> float:
-        for cat, skills in _SKILLS_BY_CAT.items():
-            if skill in skills:
-                return _CAT_WEIGHTS.get(cat, 1.0)
-        return 1.0
-
-    denom = sum(weight(s) for s in jd) or 1.0
-    num   = sum(weight(s) for s in matched)
+    denom = float(bank.weight_arr @ jd) + len(jd_other) or 1.0
+    num   = float(bank.weight_arr @ matched) + len(matched_o)
     score = round(100.0 * num / denom, 2)
 
     # category breakdown (optional)
-    breakdown: Dict[str, Dict[str, int]] = {}
-    for cat, skills in _SKILLS_BY_CAT.items():
-        j = len(jd & skills)
-        m = len(matched & skills)
-        if j > 0:
-            breakdown[cat] = {"jd_total": j, "matched": m}
+    j = bank.cat_matrix @ jd
+    m = bank.cat_matrix @ matched
+    breakdown: Dict[str, Dict[str, int]] = {
+        bank.categories[k]: {"jd_total": int(j[k]), "matched": int(m[k])} for k in np.flatnonzero(j)
+    }
+
+    def names(vec: np.ndarray, other: Set[str]) -> List[str]:
+        listed = vector_skills(vec, bank)
+        return sorted(listed + list(other)) if other else listed
 
     return {
         "score": score,
-        "matched": sorted(matched),
-        "missing": sorted(missing),
-        "extra": sorted(extra),
-        "jd_skills": sorted(jd),
-        "cv_skills": sorted(cv),
+        "matched": names(matched, matched_o),
+        "missing": names(missing, jd_other - cv_other),
+        "extra": names(extra, cv_other - jd_other),
+        "jd_skills": names(jd, jd_other),
+        "cv_skills": names(cv, cv_other),
         "category_breakdown": breakdown
     }
@@ -1,5 +1,5 @@
 # utils/suggestions.py
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 TEMPLATES = {
     "data_engineering_core": "Add a bullet under Experience showing {skill} used to build/maintain data pipelines, including orchestration and monitoring.",
@@ -13,18 +13,26 @@ TEMPLATES = {
 }
 
 # Map a skill to a rough category name string from extractor
-def _find_cat(skill: str, skills_by_cat: Dict[str, set]) -> str:
+def _cat_index(skills_by_cat: Dict[str, set]) -> Dict[str, str]:
+    """skill -> first category containing it, built once instead of scanning per skill."""
+    index: Dict[str, str] = {}
     for cat, skills in skills_by_cat.items():
-        if skill in skills:
-            return cat
-    return "general"
+        for skill in skills:
+            index.setdefault(skill, cat)
+    return index
 
-def craft_suggestions(results: Dict, skills_by_cat: Dict[str, set], ats_report: Dict) -> List[str]:
+def craft_suggestions(results: Dict, skills_by_cat: Dict[str, set], ats_report: Dict, *,
+                      skill_cat: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    `skill_cat` (skill -> category, e.g. SkillBank.skill_cat) saves indexing
+    `skills_by_cat` on every call.
+    """
     sug: List[str] = []
 
     # 1) Missing skills -> targeted bullets
+    cat_of = skill_cat if skill_cat is not None else _cat_index(skills_by_cat)
     for s in results.get("missing", [])[:10]:  # cap to keep concise
-        cat = _find_cat(s, skills_by_cat)
+        cat = cat_of.get(s, "general")
         tmpl = TEMPLATES.get(cat, "Add {skill} with a concrete project/result bullet.")
         sug.append(tmpl.format(skill=s))
 
@@ -0,0 +1,229 @@
+# utils/telemetry.py
+"""
+Lightweight stage timers and counters for the analysis pipeline.
+
+    with telemetry.request("analysis"):      # one record per request
+        with telemetry.stage("exact_hits"):  # or @telemetry.timed("...")
+            ...
+        telemetry.count("fuzzy_comparisons", n)
+
+Stage times and counters are aggregated process-wide (see prometheus_text)
+and, inside a request(), also collected into a per-request record that is
+handed to every sink when the request ends: "log" writes it as one JSON
+line on the cvsense.telemetry logger, "memory" keeps the last records for
+the app's debug panel (CVSENSE_TELEMETRY_SINKS, default "memory").
+
+Setting CVSENSE_PROFILE_SLOW_MS profiles requests under cProfile (a
+CVSENSE_PROFILE_SAMPLE fraction of them, default all) and dumps pstats
+files for those slower than the threshold into CVSENSE_PROFILE_DIR.
+CVSENSE_TELEMETRY=0 turns everything into no-ops.
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+ENABLED = os.environ.get("CVSENSE_TELEMETRY", "1") != "0"
+PROFILE_SLOW_MS = float(os.environ.get("CVSENSE_PROFILE_SLOW_MS", 0))
+PROFILE_SAMPLE = float(os.environ.get("CVSENSE_PROFILE_SAMPLE", 1.0))
+PROFILE_DIR = os.environ.get("CVSENSE_PROFILE_DIR", "profiles")
+
+log = logging.getLogger("cvsense.telemetry")
+
+_lock = threading.Lock()
+_stages: Dict[str, List[float]] = {}   # name -> [count, total_s, max_s]
+_counters: Dict[str, int] = {}
+_current: contextvars.ContextVar = contextvars.ContextVar("cvsense_request", default=None)
+
+
+# --------- recording ---------
+def _observe(name: str, dt: float):
+    with _lock:
+        agg = _stages.get(name)
+        if agg is None:
+            _stages[name] = [1, dt, dt]
+        else:
+            agg[0] += 1
+            agg[1] += dt
+            agg[2] = max(agg[2], dt)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        _observe(name, dt)
+        rec = _current.get()
+        if rec is not None:
+            rec["stages_ms"][name] = round(rec["stages_ms"].get(name, 0.0) + dt * 1000.0, 3)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage()."""
+    def deco(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def count(name: str, n: int = 1):
+    if not ENABLED or not n:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    rec = _current.get()
+    if rec is not None:
+        rec["counters"][name] = rec["counters"].get(name, 0) + n
+
+
+@contextlib.contextmanager
+def request(name: str, **labels: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Scope one request: yields its record (None when disabled), which is
+    complete and sent to the sinks once the block exits.
+    """
+    if not ENABLED:
+        yield None
+        return
+    rec: Dict[str, Any] = {
+        "request": name, "labels": labels, "started": time.time(),
+        "duration_ms": 0.0, "stages_ms": {}, "counters": {}, "error": "",
+    }
+    token = _current.set(rec)
+    prof = None
+    if PROFILE_SLOW_MS and random.random() < PROFILE_SAMPLE:
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # another profiler is active on this thread
+            prof = None
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        rec["duration_ms"] = round(dt * 1000.0, 3)
+        if prof is not None:
+            prof.disable()
+            if rec["duration_ms"] >= PROFILE_SLOW_MS:
+                rec["profile"] = _dump_profile(prof, name)
+        _current.reset(token)
+        _observe(f"request:{name}", dt)
+        for sink in list(_sinks):
+            try:
+                sink(rec)
+            except Exception:
+                log.exception("telemetry sink failed")
+
+
+def _dump_profile(prof: cProfile.Profile, name: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(
+        PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}.pstats"
+    )
+    prof.dump_stats(path)
+    return path
+
+
+# --------- sinks ---------
+class LogSink:
+    """One JSON line per request on the cvsense.telemetry logger."""
+
+    def __init__(self, logger: logging.Logger = log, level: int = logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, rec: Dict[str, Any]):
+        self.logger.log(self.level, json.dumps(rec, sort_keys=True))
+
+
+class MemorySink:
+    """The last `max_records` request records, newest last (for a debug panel)."""
+
+    def __init__(self, max_records: int = 50):
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+
+    def __call__(self, rec: Dict[str, Any]):
+        self.records.append(rec)
+
+    def latest(self, n: int = 10) -> List[Dict[str, Any]]:
+        return list(self.records)[-n:]
+
+
+memory_sink = MemorySink()
+_sinks: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_sink(sink: Callable[[Dict[str, Any]], None]):
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Callable[[Dict[str, Any]], None]):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+for _name in os.environ.get("CVSENSE_TELEMETRY_SINKS", "memory").split(","):
+    _name = _name.strip()
+    if _name == "memory":
+        add_sink(memory_sink)
+    elif _name == "log":
+        add_sink(LogSink())
+
+
+# --------- export ---------
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "stages": {
+                k: {"count": int(c), "total_ms": round(t * 1000.0, 3), "max_ms": round(m * 1000.0, 3)}
+                for k, (c, t, m) in _stages.items()
+            },
+            "counters": dict(_counters),
+        }
+
+
+def prometheus_text(prefix: str = "cvsense") -> str:
+    """Aggregates in the Prometheus text exposition format."""
+    snap = snapshot()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Wall time spent in each pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for name, s in sorted(snap["stages"].items()):
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {s["total_ms"] / 1000.0:.6f}')
+    lines.append(f"# HELP {prefix}_stage_seconds_max Slowest single call per stage.")
+    lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+    for name, s in sorted(snap["stages"].items()):
+        lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {s["max_ms"] / 1000.0:.6f}')
+    for name, v in sorted(snap["counters"].items()):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {v}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()